@@ -0,0 +1,131 @@
+from uuid import uuid4
+
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from api.cache import LocalCache, shared_cache
+from project.settings import (
+    AUTH_TOKEN_CACHE_SIZE, AUTH_TOKEN_CACHE_TIMEOUT, AUTH_TOKEN_LOCAL_TIMEOUT)
+
+
+User = get_user_model()
+# Поля пользователя в кэше: проверка прав и /users/me/, остальные поля
+# (и пароль) читаются из базы при первом обращении
+SNAPSHOT_FIELDS = tuple(
+    field.attname for field in User._meta.concrete_fields
+    if field.name in (
+        'id', 'last_login', 'is_superuser', 'username', 'first_name',
+        'last_name', 'email', 'is_staff', 'is_active', 'date_joined',
+        'avatar', 'avatar_derivatives')
+)
+local_tokens = LocalCache(AUTH_TOKEN_CACHE_SIZE, AUTH_TOKEN_LOCAL_TIMEOUT)
+local_users = LocalCache(AUTH_TOKEN_CACHE_SIZE, AUTH_TOKEN_LOCAL_TIMEOUT)
+
+
+def token_cache_key(key):
+    return f'auth-token:{key}'
+
+
+def user_cache_key(user_id):
+    return f'auth-user:{user_id}'
+
+
+def user_version_key(user_id):
+    return f'auth-user-version:{user_id}'
+
+
+def snapshot(user):
+    """Значения полей SNAPSHOT_FIELDS пользователя."""
+    return tuple(
+        getattr(user, name).name if name == 'avatar' else getattr(user, name)
+        for name in SNAPSHOT_FIELDS
+    )
+
+
+def from_snapshot(values):
+    """Пользователь из кэша, остальные поля отложены до обращения."""
+    return User.from_db(DEFAULT_DB_ALIAS, SNAPSHOT_FIELDS, values)
+
+
+def bump_user(user_id):
+    local_users.delete(user_id)
+    cache = shared_cache()
+    if cache is not None:
+        cache.set(
+            user_version_key(user_id), uuid4().hex, AUTH_TOKEN_CACHE_TIMEOUT)
+
+
+def forget_user(user_id):
+    """Новая версия пользователя: сохраненные снимки больше не подходят.
+
+    Сразу и после коммита: снимок, прочитанный до коммита, получит
+    старую версию.
+    """
+    bump_user(user_id)
+    transaction.on_commit(lambda: bump_user(user_id))
+
+
+def forget_token(key, user_id):
+    """Удаление токена из кэшей."""
+    local_tokens.delete(key)
+    cache = shared_cache()
+    if cache is not None:
+        cache.delete(token_cache_key(key))
+    forget_user(user_id)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Токен и пользователь без запросов к базе.
+
+    Сначала память процесса с коротким временем жизни, затем общий кэш,
+    если он общий для процессов: токен -> id и снимок пользователя под
+    версией, которую меняют сохранение и удаление пользователя, удаление
+    токена и выход.
+    """
+    def authenticate_credentials(self, key):
+        user_id = local_tokens.get(key)
+        values = None if user_id is None else local_users.get(user_id)
+        if values is not None:
+            user = from_snapshot(values)
+            token = Token(key=key, user=user)
+        else:
+            cache = shared_cache()
+            if cache is None:
+                user, token = super().authenticate_credentials(key)
+            else:
+                user, token = self.shared_credentials(cache, key)
+            local_tokens.set(key, user.pk)
+            local_users.set(user.pk, snapshot(user))
+        if not user.is_active:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+        return user, token
+
+    def shared_credentials(self, cache, key):
+        user_id = cache.get(token_cache_key(key))
+        if user_id is None:
+            user, token = super().authenticate_credentials(key)
+            cache.set(token_cache_key(key), user.pk, AUTH_TOKEN_CACHE_TIMEOUT)
+            return user, token
+        version_key = user_version_key(user_id)
+        user_key = user_cache_key(user_id)
+        cached = cache.get_many([version_key, user_key])
+        version = cached.get(version_key)
+        if version is not None and cached.get(user_key, (None,))[0] == version:
+            user = from_snapshot(cached[user_key][1])
+            return user, Token(key=key, user=user)
+        # Версия читается до пользователя: снимок, прочитанный до
+        # изменения, останется со старой версией
+        if version is None:
+            version = uuid4().hex
+            if not cache.add(version_key, version, AUTH_TOKEN_CACHE_TIMEOUT):
+                version = cache.get(version_key)
+        user = User.objects.filter(pk=user_id).first()
+        if user is None:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+        cache.set(
+            user_key, (version, snapshot(user)), AUTH_TOKEN_CACHE_TIMEOUT)
+        return user, Token(key=key, user=user)
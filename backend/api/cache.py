@@ -0,0 +1,56 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+class LocalCache:
+    """Ограниченный LRU-кэш в памяти процесса со временем жизни записей."""
+    def __init__(self, maxsize, timeout=None):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            value, expires = self._data[key]
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires = None
+        if self.timeout is not None:
+            expires = time.monotonic() + self.timeout
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def shared_cache():
+    """Кэш по умолчанию, если он общий для процессов, иначе None.
+
+    Удаление из LocMemCache видит только процесс, в котором оно было.
+    """
+    backend = caches['default']
+    if isinstance(backend, (LocMemCache, DummyCache)):
+        return None
+    return backend
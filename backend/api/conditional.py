@@ -0,0 +1,63 @@
+"""Условные GET-запросы: ETag, Last-Modified и ответ 304.
+
+Проверка идет до сериализации. Ответы с флагами пользователя
+(is_favorited и т.п.) помечаются private и проверяются только по ETag:
+флаги меняются, не трогая updated_at рецепта.
+"""
+from hashlib import md5
+
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers)
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    """ETag из значений, от которых зависит ответ."""
+    return quote_etag(md5(repr(parts).encode()).hexdigest())
+
+
+def last_modified_for(request, last_modified, personal):
+    if personal and request.user.is_authenticated:
+        return None
+    return last_modified
+
+
+def not_modified(
+        request, etag, last_modified=None, max_age=0, personal=False):
+    """Ответ 304, если у клиента актуальная версия, иначе None."""
+    last_modified = last_modified_for(request, last_modified, personal)
+    response = get_conditional_response(
+        request, etag=etag,
+        last_modified=last_modified and int(last_modified.timestamp()))
+    if response is None:
+        return None
+    return cache_headers(
+        response, request, etag, last_modified, max_age, personal)
+
+
+def cache_headers(
+        response, request, etag, last_modified=None, max_age=0,
+        personal=False):
+    """ETag, Last-Modified и Cache-Control для nginx и браузера."""
+    last_modified = last_modified_for(request, last_modified, personal)
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    if personal:
+        patch_vary_headers(response, ['Authorization'])
+    if personal and request.user.is_authenticated:
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(response, public=True, max_age=max_age)
+    return response
+
+
+def conditional_response(
+        request, etag, render, last_modified=None, max_age=0,
+        personal=False):
+    """Ответ 304 или render() с заголовками кэширования."""
+    response = not_modified(request, etag, last_modified, max_age, personal)
+    if response is not None:
+        return response
+    return cache_headers(
+        render(), request, etag, last_modified, max_age, personal)
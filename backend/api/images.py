@@ -0,0 +1,125 @@
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image
+
+from project.settings import IMAGE_WORKERS
+
+
+logger = logging.getLogger(__name__)
+# Название: (максимальный размер, формат Pillow, расширение файла)
+DERIVATIVES = {
+    'thumbnail': ((480, 480), 'JPEG', 'jpg'),
+    'webp': ((1200, 1200), 'WEBP', 'webp'),
+}
+executor = ThreadPoolExecutor(
+    max_workers=IMAGE_WORKERS, thread_name_prefix='images')
+
+
+def derivative_name(name, kind):
+    """Путь к уменьшенной копии рядом с оригиналом."""
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    extension = DERIVATIVES[kind][2]
+    return posixpath.join(
+        directory, 'derivatives', f'{stem}_{kind}.{extension}')
+
+
+def make_derivatives(name, storage=default_storage):
+    """Сохранение уменьшенных копий изображения."""
+    with storage.open(name) as file:
+        image = Image.open(file)
+        image.load()
+    for kind, (size, image_format, _) in DERIVATIVES.items():
+        result = image.copy()
+        result.thumbnail(size)
+        if image_format == 'JPEG' and result.mode != 'RGB':
+            result = result.convert('RGB')
+        buffer = BytesIO()
+        result.save(buffer, image_format, quality=80)
+        path = derivative_name(name, kind)
+        storage.delete(path)
+        storage.save(path, ContentFile(buffer.getvalue()))
+
+
+def derivatives_exist(name, storage=default_storage):
+    """Все уменьшенные копии файла name уже сохранены."""
+    return all(
+        storage.exists(derivative_name(name, kind)) for kind in DERIVATIVES)
+
+
+def ready_field(field_file):
+    """Поле с именем файла, для которого готовы уменьшенные копии."""
+    return f'{field_file.field.name}_derivatives'
+
+
+def derivatives_ready(model, pk, field, name):
+    """Отметить копии name готовыми, если у объекта все еще этот файл.
+
+    save() меняет updated_at и запускает сигналы, так что ETag ответов
+    с этим изображением тоже меняется.
+    """
+    instance = model.objects.filter(pk=pk, **{field: name}).first()
+    if instance is None:
+        return
+    setattr(instance, f'{field}_derivatives', name)
+    instance.save(update_fields=[
+        f'{field}_derivatives',
+        *(model_field.name for model_field in model._meta.concrete_fields
+          if getattr(model_field, 'auto_now', False))
+    ])
+
+
+def _make_derivatives(model, pk, field, name, storage):
+    try:
+        make_derivatives(name, storage)
+        derivatives_ready(model, pk, field, name)
+    except Exception:
+        logger.exception('Не удалось обработать изображение %s', name)
+    finally:
+        connection.close()
+
+
+def schedule_derivatives(field_file):
+    """Обработка изображения в фоне после сохранения в базу."""
+    if not field_file:
+        return
+    args = (
+        type(field_file.instance), field_file.instance.pk,
+        field_file.field.name, field_file.name, field_file.storage)
+    transaction.on_commit(lambda: executor.submit(_make_derivatives, *args))
+
+
+def delete_derivatives(field_file):
+    """Удаление уменьшенных копий вместе с оригиналом."""
+    if not field_file:
+        return
+    for kind in DERIVATIVES:
+        field_file.storage.delete(derivative_name(field_file.name, kind))
+
+
+def storage_derivative_url(storage, name, kind, ready):
+    """Ссылка на уменьшенную копию файла name, пока ее нет - на оригинал.
+
+    ready - имя файла, для которого копии готовы, без обращения к storage.
+    """
+    if ready == name:
+        return storage.url(derivative_name(name, kind))
+    return storage.url(name)
+
+
+def derivative_url(field_file, kind, request=None):
+    """Ссылка на уменьшенную копию, пока ее нет - на оригинал."""
+    if not field_file:
+        return None
+    url = storage_derivative_url(
+        field_file.storage, field_file.name, kind,
+        getattr(field_file.instance, ready_field(field_file)))
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
@@ -0,0 +1,216 @@
+"""Замеры времени запросов: заголовок Server-Timing и метрики Prometheus.
+
+Гистограммы хранятся в памяти процесса, каждый воркер отдает свои.
+Запросы к базе считает обертка на каждом соединении: метрики запроса она
+берет из contextvar, который виден и в потоках sync_to_async.
+"""
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+from threading import Lock
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+
+
+# Название: (описание, границы корзин)
+HISTOGRAMS = {
+    'foodgram_request_duration_seconds': (
+        'Время обработки запроса',
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)),
+    'foodgram_db_duration_seconds': (
+        'Время запросов к базе',
+        (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)),
+    'foodgram_db_queries': (
+        'Количество запросов к базе',
+        (0, 1, 2, 3, 5, 10, 20, 50, 100)),
+    'foodgram_render_duration_seconds': (
+        'Время сериализации ответа',
+        (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)),
+}
+
+
+class Histogram:
+    """Накопительные счетчики по корзинам, сумма и количество."""
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    def __init__(self):
+        self.lock = Lock()
+        self.histograms = {
+            name: defaultdict(lambda buckets=buckets: Histogram(buckets))
+            for name, (_, buckets) in HISTOGRAMS.items()
+        }
+
+    def observe(self, view, **values):
+        with self.lock:
+            for name, value in values.items():
+                self.histograms[name][view].observe(value)
+
+    def render(self):
+        """Метрики в текстовом формате Prometheus."""
+        lines = []
+        with self.lock:
+            for name, (description, buckets) in HISTOGRAMS.items():
+                lines.append(f'# HELP {name} {description}')
+                lines.append(f'# TYPE {name} histogram')
+                for view, histogram in sorted(self.histograms[name].items()):
+                    label = view.replace('\\', '\\\\').replace('"', '\\"')
+                    total = 0
+                    for bound, count in zip(
+                            (*buckets, '+Inf'), histogram.counts):
+                        total += count
+                        lines.append(
+                            f'{name}_bucket{{view="{label}",le="{bound}"}} '
+                            f'{total}')
+                    lines.append(
+                        f'{name}_sum{{view="{label}"}} {histogram.sum}')
+                    lines.append(
+                        f'{name}_count{{view="{label}"}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class RequestMetrics:
+    """Счетчики одного запроса."""
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0
+        self.view_started = None
+        self.view_time = 0
+        self.render_time = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+
+def record(execute, sql, params, many, context):
+    """Запрос к базе в метриках текущего запроса, если он есть."""
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+def instrument(db_connection):
+    if record not in db_connection.execute_wrappers:
+        db_connection.execute_wrappers.append(record)
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    instrument(connection)
+
+
+class MetricsMiddleware:
+    """Количество запросов к базе и время обработки каждого запроса.
+
+    Синхронный и асинхронный: первым в цепочке он не заставляет Django
+    переводить асинхронные вьюхи в поток.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Соединения, открытые до загрузки модуля
+        instrument(connection)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        instrument(connection)
+        token = current_metrics.set(self.start(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response)
+
+    async def __acall__(self, request):
+        token = current_metrics.set(self.start(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response)
+
+    def start(self, request):
+        request._metrics = RequestMetrics()
+        return request._metrics
+
+    def finish(self, request, response):
+        metrics = request._metrics
+        finished = time.perf_counter()
+        total = finished - metrics.started
+        if metrics.view_started and not metrics.view_time:
+            metrics.view_time = finished - metrics.view_started
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        registry.observe(
+            view,
+            foodgram_request_duration_seconds=total,
+            foodgram_db_duration_seconds=metrics.db_time,
+            foodgram_db_queries=metrics.queries,
+            foodgram_render_duration_seconds=metrics.render_time,
+        )
+        app_time = max(metrics.view_time - metrics.db_time, 0)
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={metrics.db_time * 1000:.1f};'
+            f'desc="{metrics.queries} queries"',
+            f'app;dur={app_time * 1000:.1f}',
+            f'render;dur={metrics.render_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        metrics = request._metrics
+        started = time.perf_counter()
+        metrics.view_time = started - metrics.view_started
+
+        def rendered(response):
+            metrics.render_time = time.perf_counter() - started
+
+        response.add_post_render_callback(rendered)
+        return response
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def metrics(request):
+    """Метрики для Prometheus, только для администраторов."""
+    return HttpResponse(
+        registry.render(), content_type='text/plain; version=0.0.4')
@@ -0,0 +1,7 @@
+from rest_framework.negotiation import DefaultContentNegotiation
+
+
+class IgnoreFormatNegotiation(DefaultContentNegotiation):
+    """Параметр format обрабатывает сама вьюха, а не рендерер."""
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
@@ -1,5 +1,105 @@
+from base64 import b64decode, b64encode
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 
 class RecipePagination(PageNumberPagination):
     page_size_query_param = 'limit'
+
+
+class RecipeCursorPagination(RecipePagination):
+    """Постраничный вывод, с параметром cursor - по (created_at, id).
+
+    По курсору - только вперед, previous всегда None. С параметрами из
+    ranking_query_params порядок задает фильтр (поиск - по релевантности),
+    поэтому cursor игнорируется и выдача идет по номерам страниц.
+    """
+    cursor_query_param = 'cursor'
+    ranking_query_params = ('search',)
+    ordering = ('-created_at', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = (
+            self.cursor_query_param in request.query_params
+            and not any(
+                request.query_params.get(name)
+                for name in self.ranking_query_params))
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(
+            request.query_params[self.cursor_query_param])
+        if position:
+            created_at, pk = position
+            queryset = queryset.filter(
+                Q(created_at__lte=created_at),
+                Q(created_at__lt=created_at) | Q(id__lt=pk))
+        results = list(queryset[:page_size + 1])
+        self.page_results = results[:page_size]
+        self.has_next = len(results) > page_size
+        return self.page_results
+
+    def paginate_keys(self, request, fetch):
+        """Всегда по курсору: ключи (created_at, id) из fetch(позиция, N)."""
+        self.keyset = True
+        self.request = request
+        page_size = self.get_page_size(request)
+        keys = fetch(
+            self.decode_cursor(
+                request.query_params.get(self.cursor_query_param)),
+            page_size + 1)
+        self.page_results = [
+            {'created_at': created_at, 'id': pk}
+            for created_at, pk in keys[:page_size]
+        ]
+        self.has_next = len(keys) > page_size
+        return [pk for _, pk in keys[:page_size]]
+
+    def page_state(self):
+        """От чего кроме строк страницы зависит ответ: для ETag."""
+        if self.keyset:
+            return self.has_next
+        return self.page.paginator.count
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'previous': None,
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        last = self.page_results[-1]
+        if isinstance(last, dict):
+            position = last['created_at'], last['id']
+        else:
+            position = last.created_at, last.pk
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param,
+            self.encode_cursor(*position))
+
+    def encode_cursor(self, created_at, pk):
+        value = f'{created_at.isoformat()}|{pk}'
+        return b64encode(value.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None
+        try:
+            created_at, pk = b64decode(cursor.encode()).decode().split('|')
+            return datetime.fromisoformat(created_at), int(pk)
+        except ValueError:
+            raise NotFound('Неверный курсор.')
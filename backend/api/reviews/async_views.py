@@ -0,0 +1,181 @@
+"""Асинхронные вьюхи для чтения рецептов, тегов и ингредиентов.
+
+Подключаются при запуске через ASGI (ASYNC_READ_VIEWS). Обрабатывают
+только GET, остальные методы передаются обычным вьюхам DRF.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse, HttpResponseBase
+from django.shortcuts import redirect
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import ForcedAuthentication, Request
+from rest_framework.views import exception_handler
+
+from api.authentication import CachedTokenAuthentication
+from api.conditional import cache_headers, make_etag, not_modified
+from api.pagination import RecipeCursorPagination
+from api.utils import get_fields, resolve_short_link
+from project.settings import CATALOG_MAX_AGE, RECIPES_MAX_AGE
+from reviews.models import CatalogVersion, Ingredient, Recipe, Tag
+from .filters import IngredientFilter, RecipeFilter
+from .projections import (
+    RECIPE_FIELDS, recipe_values, recipes_etag, render_recipes)
+from .serializers import IngredientSerializer, TagSerializer
+
+
+def render(data, status=200, headers=None):
+    return HttpResponse(
+        JSONRenderer().render(data), status=status, headers=headers,
+        content_type='application/json')
+
+
+def async_api_view(view):
+    """Аутентификация по токену и ответы с ошибками как в DRF."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        authenticator = CachedTokenAuthentication()
+        try:
+            result = await sync_to_async(authenticator.authenticate)(request)
+            authenticators = [ForcedAuthentication(*result)] if result else []
+            drf_request = Request(request, authenticators=authenticators)
+            result = await view(drf_request, *args, **kwargs)
+            if isinstance(result, HttpResponseBase):
+                return result
+            return render(result)
+        except (exceptions.APIException, Http404) as error:
+            if isinstance(error, exceptions.AuthenticationFailed):
+                error.auth_header = authenticator.authenticate_header(request)
+            response = exception_handler(error, {})
+            headers = dict(response.headers)
+            headers.pop('Content-Type', None)
+            return render(response.data, response.status_code, headers)
+    return wrapper
+
+
+async def aget_object_or_404(queryset, **kwargs):
+    """Асинхронный аналог get_object_or_404."""
+    try:
+        return await queryset.aget(**kwargs)
+    except queryset.model.DoesNotExist:
+        raise Http404(
+            f'No {queryset.model._meta.object_name} matches the given query.')
+
+
+def filter_queryset(filterset):
+    """Queryset из фильтра; проверка параметров обращается к базе."""
+    if not filterset.is_valid():
+        raise exceptions.ValidationError(filterset.errors)
+    return filterset.qs
+
+
+def catalog_view(catalog):
+    """Ответ 304 по версии справочника, как в CatalogViewSet."""
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            version, updated_at = await sync_to_async(
+                CatalogVersion.objects.current)(catalog)
+            etag = make_etag(catalog, version)
+            response = not_modified(
+                request, etag, updated_at, CATALOG_MAX_AGE)
+            if response is None:
+                response = cache_headers(
+                    render(await view(request, *args, **kwargs)), request,
+                    etag, updated_at, CATALOG_MAX_AGE)
+            return response
+        return wrapper
+    return decorator
+
+
+def with_async_get(async_view, sync_view):
+    """GET - асинхронная вьюха, остальные методы - обычная."""
+    async def view(request, *args, **kwargs):
+        if request.method == 'GET':
+            return await async_view(request, *args, **kwargs)
+        return await sync_to_async(sync_view)(request, *args, **kwargs)
+    view.csrf_exempt = True
+    return view
+
+
+@async_api_view
+@catalog_view(CatalogVersion.TAGS)
+async def tag_list(request):
+    return TagSerializer(
+        [tag async for tag in Tag.objects.all()], many=True).data
+
+
+@async_api_view
+@catalog_view(CatalogVersion.TAGS)
+async def tag_detail(request, pk):
+    tag = await aget_object_or_404(Tag.objects.all(), pk=pk)
+    return TagSerializer(tag).data
+
+
+@async_api_view
+@catalog_view(CatalogVersion.INGREDIENTS)
+async def ingredient_list(request):
+    filterset = IngredientFilter(
+        request.query_params, queryset=Ingredient.objects.all(),
+        request=request)
+    queryset = await sync_to_async(filter_queryset)(filterset)
+    return IngredientSerializer(
+        [ingredient async for ingredient in queryset], many=True).data
+
+
+@async_api_view
+@catalog_view(CatalogVersion.INGREDIENTS)
+async def ingredient_detail(request, pk):
+    ingredient = await aget_object_or_404(Ingredient.objects.all(), pk=pk)
+    return IngredientSerializer(ingredient).data
+
+
+@async_api_view
+async def recipe_list(request):
+    filterset = RecipeFilter(
+        request.query_params,
+        queryset=Recipe.objects.with_user_flags(request.user),
+        request=request)
+    queryset = await sync_to_async(filter_queryset)(filterset)
+    fields = get_fields(request, RECIPE_FIELDS)
+    paginator = RecipeCursorPagination()
+    page = await sync_to_async(paginator.paginate_queryset)(
+        recipe_values(queryset, fields), request)
+    etag = recipes_etag(page, paginator.page_state())
+    response = not_modified(
+        request, etag, max_age=RECIPES_MAX_AGE, personal=True)
+    if response is None:
+        data = await sync_to_async(render_recipes)(page, request, fields)
+        response = cache_headers(
+            render(paginator.get_paginated_response(data).data), request,
+            etag, max_age=RECIPES_MAX_AGE, personal=True)
+    return response
+
+
+@async_api_view
+async def recipe_detail(request, pk):
+    filterset = RecipeFilter(
+        request.query_params,
+        queryset=Recipe.objects.with_user_flags(request.user),
+        request=request)
+    queryset = await sync_to_async(filter_queryset)(filterset)
+    fields = get_fields(request, RECIPE_FIELDS)
+    recipe = await aget_object_or_404(recipe_values(queryset, fields), pk=pk)
+    etag = recipes_etag([recipe])
+    response = not_modified(
+        request, etag, recipe['updated_at'], RECIPES_MAX_AGE, True)
+    if response is None:
+        data = await sync_to_async(render_recipes)([recipe], request, fields)
+        response = cache_headers(
+            render(data[0]), request, etag, recipe['updated_at'],
+            RECIPES_MAX_AGE, True)
+    return response
+
+
+async def short_link(request, link):
+    """Короткая ссылка"""
+    recipe_id = await sync_to_async(resolve_short_link)(link)
+    if recipe_id is None:
+        raise Http404
+    return redirect(f'/recipes/{recipe_id}/')
@@ -1,6 +1,7 @@
 import django_filters
-from reviews.models import (
-    ShoppingCart, Favorite, Recipe, Tag, Ingredient)
+from reviews.autocomplete import autocomplete
+from reviews.search import search
+from reviews.models import Recipe, Tag, Ingredient, tags_mask
 
 
 class RecipeFilter(django_filters.FilterSet):
@@ -17,15 +18,26 @@ class RecipeFilter(django_filters.FilterSet):
     )
     tags = django_filters.ModelMultipleChoiceFilter(
         queryset=Tag.objects.all(),
-        field_name='tags__slug',
         to_field_name='slug',
+        method='filter_tags',
         label='Теги'
     )
+    search = django_filters.CharFilter(method='filter_search', label='Поиск')
 
     class Meta:
         model = Recipe
         fields = ['author']
 
+    def filter_search(self, queryset, name, value):
+        """Поиск по названию и описанию, сначала самые подходящие"""
+        return search(queryset, value)
+
+    def filter_tags(self, queryset, name, value):
+        """Рецепты хотя бы с одним из тегов, по маске без JOIN"""
+        if not value:
+            return queryset
+        return queryset.with_any_tags(tags_mask(tag.bit for tag in value))
+
     def filter(self, queryset, name, value):
         """Фильтр избраное и список покупок"""
         if value == '1':
@@ -35,26 +47,22 @@ class RecipeFilter(django_filters.FilterSet):
         else:
             return queryset
 
-        if name == 'is_favorited':
-            model = Favorite
-        elif name == 'is_in_shopping_cart':
-            model = ShoppingCart
-
         if not self.request.user.is_authenticated:
             return queryset
 
-        result = model.objects.filter(
-            user=self.request.user).values('recipe')
-        if value:
-            return queryset.filter(id__in=result)
-        else:
-            return queryset.exclude(id__in=result)
+        if name not in queryset.query.annotations:
+            queryset = queryset.with_user_flags(self.request.user)
+        return queryset.filter(**{name: value})
 
 
 class IngredientFilter(django_filters.FilterSet):
     """Фильтр для ингридиентов"""
-    name = django_filters.CharFilter(lookup_expr='icontains')
+    name = django_filters.CharFilter(method='filter_name')
 
     class Meta:
         model = Ingredient
         fields = ['name']
+
+    def filter_name(self, queryset, name, value):
+        """Автодополнение по названию"""
+        return autocomplete(queryset, value)
@@ -0,0 +1,140 @@
+"""Быстрый вывод рецептов для list/retrieve без сериализаторов DRF.
+
+Формат ответа совпадает с RecipeSerializer.
+"""
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+
+from api.conditional import make_etag
+from api.images import storage_derivative_url
+from reviews.models import Recipe, RecipeIngredient
+
+
+User = get_user_model()
+IMAGE_STORAGE = Recipe._meta.get_field('image').storage
+AVATAR_STORAGE = User._meta.get_field('avatar').storage
+# Поле ответа: колонки values(), которые для него нужны
+COLUMNS = {
+    'id': (),
+    'tags': (),
+    'author': (
+        'author__email', 'author__id', 'author__username',
+        'author__first_name', 'author__last_name', 'author__avatar',
+        'author__avatar_derivatives', 'author_is_subscribed'),
+    'ingredients': (),
+    'is_favorited': ('is_favorited',),
+    'is_in_shopping_cart': ('is_in_shopping_cart',),
+    'name': ('name',),
+    'image': ('image',),
+    'image_thumbnail': ('image', 'image_derivatives'),
+    'image_webp': ('image', 'image_derivatives'),
+    'text': ('text',),
+    'cooking_time': ('cooking_time',),
+}
+RECIPE_FIELDS = tuple(COLUMNS)
+FLAGS = ('is_favorited', 'is_in_shopping_cart', 'author_is_subscribed')
+
+
+def recipe_values(queryset, fields=RECIPE_FIELDS):
+    """Строки рецептов только с колонками для полей fields, без связей."""
+    annotations = queryset.query.annotations
+    columns = dict.fromkeys(('id', 'created_at', 'updated_at'))
+    for name in fields:
+        columns.update(dict.fromkeys(
+            column for column in COLUMNS[name]
+            if column not in FLAGS or column in annotations))
+    return queryset.prefetch_related(None).values(*columns)
+
+
+def recipes_etag(rows, *parts):
+    """ETag для строк recipe_values: версии рецептов и флаги."""
+    return make_etag(parts, [
+        (row['id'], row['updated_at'],
+         *(row[name] for name in FLAGS if name in row))
+        for row in rows
+    ])
+
+
+def recipe_tags(ids):
+    tags = defaultdict(list)
+    for recipe_id, tag_id, name, slug in Recipe.tags.through.objects.filter(
+        recipe_id__in=ids
+    ).order_by('tag__name').values_list(
+        'recipe_id', 'tag__id', 'tag__name', 'tag__slug'
+    ):
+        tags[recipe_id].append({'id': tag_id, 'name': name, 'slug': slug})
+    return tags
+
+
+def recipe_ingredients(ids):
+    ingredients = defaultdict(list)
+    for recipe_id, ingredient_id, name, unit, amount in (
+        RecipeIngredient.objects.filter(recipe_id__in=ids).order_by(
+            'pk'
+        ).values_list(
+            'recipe_id', 'ingredient__id', 'ingredient__name',
+            'ingredient__measurement_unit', 'amount'
+        )
+    ):
+        ingredients[recipe_id].append({
+            'id': ingredient_id, 'name': name, 'measurement_unit': unit,
+            'amount': amount,
+        })
+    return ingredients
+
+
+def render_recipes(rows, request=None, fields=RECIPE_FIELDS):
+    """Ответ с полями fields для строк recipe_values."""
+    authenticated = request is not None and request.user.is_authenticated
+
+    def url(storage, name, kind=None, ready=None):
+        if not name:
+            return None
+        if kind is None:
+            result = storage.url(name)
+        else:
+            result = storage_derivative_url(storage, name, kind, ready)
+        if request is not None:
+            return request.build_absolute_uri(result)
+        return result
+
+    def flag(name):
+        return lambda row: authenticated and row[name]
+
+    def author(row):
+        return {
+            'email': row['author__email'],
+            'id': row['author__id'],
+            'username': row['author__username'],
+            'first_name': row['author__first_name'],
+            'last_name': row['author__last_name'],
+            'is_subscribed': authenticated and row['author_is_subscribed'],
+            'avatar': url(AVATAR_STORAGE, row['author__avatar']),
+            'avatar_thumbnail': url(
+                AVATAR_STORAGE, row['author__avatar'], 'thumbnail',
+                row['author__avatar_derivatives']),
+        }
+
+    ids = [row['id'] for row in rows]
+    tags = recipe_tags(ids) if 'tags' in fields else None
+    ingredients = recipe_ingredients(ids) if 'ingredients' in fields else None
+    builders = {
+        'id': lambda row: row['id'],
+        'tags': lambda row: tags[row['id']],
+        'author': author,
+        'ingredients': lambda row: ingredients[row['id']],
+        'is_favorited': flag('is_favorited'),
+        'is_in_shopping_cart': flag('is_in_shopping_cart'),
+        'name': lambda row: row['name'],
+        'image': lambda row: url(IMAGE_STORAGE, row['image']),
+        'image_thumbnail': lambda row: url(
+            IMAGE_STORAGE, row['image'], 'thumbnail',
+            row['image_derivatives']),
+        'image_webp': lambda row: url(
+            IMAGE_STORAGE, row['image'], 'webp', row['image_derivatives']),
+        'text': lambda row: row['text'],
+        'cooking_time': lambda row: row['cooking_time'],
+    }
+    selected = [(name, builders[name]) for name in fields]
+    return [{name: build(row) for name, build in selected} for row in rows]
@@ -1,9 +1,14 @@
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from rest_framework import serializers
 from drf_extra_fields.fields import Base64ImageField
 from reviews.models import Tag, Recipe, Ingredient, RecipeIngredient
+from api.images import derivative_url, schedule_derivatives
 from api.users.serializers import UsersSerializer
-from api.utils import recipe_create_and_update
+from api.utils import (
+    SparseFieldsMixin, get_fields, recipe_create_and_update)
+from project.settings import (
+    PANTRY_DEFAULT_MISSING, PANTRY_MAX_INGREDIENTS, PANTRY_MAX_MISSING)
 
 
 User = get_user_model()
@@ -13,7 +18,7 @@ class TagSerializer(serializers.ModelSerializer):
     """Серелизатор для вывода тегов"""
     class Meta:
         model = Tag
-        fields = '__all__'
+        fields = ['id', 'name', 'slug']
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -38,33 +43,52 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
 
 #  -------------------------------------------------------
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Серелизатор для списка рецептов"""
-    author = UsersSerializer(read_only=True)
+    author = serializers.SerializerMethodField(read_only=True)
     ingredients = serializers.SerializerMethodField(read_only=True)
     tags = TagSerializer(many=True)
     is_favorited = serializers.SerializerMethodField(read_only=True)
     is_in_shopping_cart = serializers.SerializerMethodField(read_only=True)
     image = serializers.ImageField()
+    image_thumbnail = serializers.SerializerMethodField(read_only=True)
+    image_webp = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = Recipe
         fields = [
             'id', 'tags', 'author', 'ingredients', 'is_favorited',
-            'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time']
+            'is_in_shopping_cart', 'name', 'image', 'image_thumbnail',
+            'image_webp', 'text', 'cooking_time']
+
+    def get_image_thumbnail(self, obj):
+        return derivative_url(
+            obj.image, 'thumbnail', self.context.get('request'))
+
+    def get_image_webp(self, obj):
+        return derivative_url(obj.image, 'webp', self.context.get('request'))
 
     def get_is_favorited(self, obj):
         request = self.context.get('request')
         if not request or request.user.is_anonymous:
             return False
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         return request.user.favorites.filter(recipe=obj).exists()
 
     def get_is_in_shopping_cart(self, obj):
         request = self.context.get('request')
         if not request or request.user.is_anonymous:
             return False
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         return request.user.shoppingcarts.filter(recipe=obj).exists()
 
+    def get_author(self, obj):
+        if hasattr(obj, 'author_is_subscribed'):
+            obj.author.is_subscribed = obj.author_is_subscribed
+        return UsersSerializer(obj.author, context=self.context).data
+
     def get_ingredients(self, obj):
         result = obj.recipeingredients.all()
         return RecipeIngredientSerializer(result, many=True).data
@@ -90,7 +114,7 @@ class AddRecipeSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = [
             'ingredients', 'tags', 'image', 'name', 'text', 'name',
-            'cooking_time', 'link']
+            'cooking_time']
 
     def validate_image(self, value):
         if not value:
@@ -105,30 +129,60 @@ class AddRecipeSerializer(serializers.ModelSerializer):
                 "Не может быть одинаковых игридиентов")
         return value
 
+    def validate(self, data):
+        """Поля ответа проверяются до сохранения рецепта."""
+        request = self.context.get('request')
+        if request:
+            get_fields(request, RecipeSerializer.Meta.fields)
+        return data
+
     def to_representation(self, instance):
-        recipe_serializer = RecipeSerializer(instance, context=self.context)
+        request = self.context.get('request')
+        if request:
+            instance = Recipe.objects.with_user_flags(
+                request.user).with_related().get(pk=instance.pk)
+        recipe_serializer = RecipeSerializer(
+            instance, context=self.context, fields=request and get_fields(
+                request, RecipeSerializer.Meta.fields))
         return recipe_serializer.data
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients_data = validated_data.pop('ingredients', None)
         tags_data = validated_data.pop('tags', None)
         recipe = super().create(validated_data)
         recipe_create_and_update(recipe, ingredients_data, tags_data)
+        schedule_derivatives(recipe.image)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         ingredients_data = validated_data.pop('ingredients', None)
         tags_data = validated_data.pop('tags', None)
         recipe = super().update(instance, validated_data)
         recipe_create_and_update(recipe, ingredients_data, tags_data)
+        if 'image' in validated_data:
+            schedule_derivatives(recipe.image)
         return instance
 
 
 class RecipeShortSerializer(serializers.ModelSerializer):
     """Свернутый сериализатор для рецептов"""
+    image_thumbnail = serializers.SerializerMethodField(read_only=True)
+    image_webp = serializers.SerializerMethodField(read_only=True)
+
     class Meta:
         model = Recipe
-        fields = ['id', 'name', 'image', 'cooking_time']
+        fields = [
+            'id', 'name', 'image', 'image_thumbnail', 'image_webp',
+            'cooking_time']
+
+    def get_image_thumbnail(self, obj):
+        return derivative_url(
+            obj.image, 'thumbnail', self.context.get('request'))
+
+    def get_image_webp(self, obj):
+        return derivative_url(obj.image, 'webp', self.context.get('request'))
 
 
 class AddFavoriteAndShoppingCartSerializer(serializers.ModelSerializer):
@@ -144,3 +198,13 @@ class AddFavoriteAndShoppingCartSerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         serializer = RecipeShortSerializer(instance.recipe)
         return serializer.data
+
+
+class PantrySerializer(serializers.Serializer):
+    """Параметры подбора рецептов по продуктам"""
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False,
+        max_length=PANTRY_MAX_INGREDIENTS)
+    max_missing = serializers.IntegerField(
+        min_value=0, max_value=PANTRY_MAX_MISSING,
+        default=PANTRY_DEFAULT_MISSING)
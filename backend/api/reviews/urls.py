@@ -1,5 +1,7 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
+from project.settings import ASYNC_READ_VIEWS
+from . import async_views
 from .views import TagViewSet, RecipeViewSet, IngredientViewSet
 
 
@@ -11,3 +13,42 @@ router.register(r'recipes', RecipeViewSet, basename='recipes')
 urlpatterns = [
     path('', include(router.urls)),
 ]
+
+
+def async_routes(prefix, viewset, list_view, detail_view):
+    """GET списка и объекта - асинхронно, остальное - через viewset."""
+    def as_view(actions, detail):
+        return viewset.as_view(
+            {method: action for method, action in actions.items()
+             if hasattr(viewset, action)},
+            basename=prefix, detail=detail)
+
+    sync_list = as_view({'get': 'list', 'post': 'create'}, detail=False)
+    sync_detail = as_view(
+        {'get': 'retrieve', 'put': 'update', 'patch': 'partial_update',
+         'delete': 'destroy'},
+        detail=True)
+    return [
+        path(
+            f'{prefix}/',
+            async_views.with_async_get(list_view, sync_list),
+            name=f'{prefix}-list'),
+        path(
+            f'{prefix}/<int:pk>/',
+            async_views.with_async_get(detail_view, sync_detail),
+            name=f'{prefix}-detail'),
+    ]
+
+
+if ASYNC_READ_VIEWS:
+    urlpatterns = [
+        *async_routes(
+            'tags', TagViewSet,
+            async_views.tag_list, async_views.tag_detail),
+        *async_routes(
+            'ingredients', IngredientViewSet,
+            async_views.ingredient_list, async_views.ingredient_detail),
+        *async_routes(
+            'recipes', RecipeViewSet,
+            async_views.recipe_list, async_views.recipe_detail),
+    ] + urlpatterns
@@ -1,58 +1,182 @@
 from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404, redirect
-from django.http import HttpResponse
+from django.http import Http404, StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.response import Response
 from rest_framework.permissions import (
     IsAuthenticated, AllowAny, IsAuthenticatedOrReadOnly)
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from reviews.models import Tag, Recipe, Ingredient, Favorite, ShoppingCart
+from reviews.feed import feed_keys
+from reviews.pantry import pantry_index
+from reviews.shopping_lists import get_items
+from reviews.models import (
+    CatalogVersion, Tag, Recipe, Ingredient, Favorite, ShoppingCart)
+from api.conditional import conditional_response, make_etag
 from api.permissions import IsOwner
-from api.utils import add_method, remove_method
-from api.pagination import RecipePagination
+from api.negotiation import IgnoreFormatNegotiation
+from api.utils import (
+    add_method, batch_method, remove_method, get_fields,
+    resolve_short_link, SHOPPING_LIST_FORMATS)
+from api.pagination import RecipeCursorPagination, RecipePagination
 from .filters import RecipeFilter, IngredientFilter
+from .projections import (
+    RECIPE_FIELDS, recipe_values, recipes_etag, render_recipes)
 from .serializers import (
     TagSerializer, RecipeSerializer, IngredientSerializer,
-    AddRecipeSerializer, AddFavoriteAndShoppingCartSerializer)
+    AddRecipeSerializer, AddFavoriteAndShoppingCartSerializer,
+    PantrySerializer)
 
 from rest_framework.decorators import api_view, permission_classes
+from project.settings import CATALOG_MAX_AGE, RECIPES_MAX_AGE
 # from django.urls import reverse
 
 
 User = get_user_model()
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class CatalogViewSet(viewsets.ReadOnlyModelViewSet):
+    """Справочник: ответ 304 по его версии, без запроса к таблице"""
+    catalog = None
+    permission_classes = [AllowAny]
+    pagination_class = None
+
+    def conditional(self, handler, request, *args, **kwargs):
+        version, updated_at = CatalogVersion.objects.current(self.catalog)
+        etag = make_etag(self.catalog, version)
+        return conditional_response(
+            request, etag, lambda: handler(request, *args, **kwargs),
+            updated_at, CATALOG_MAX_AGE)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super().retrieve, request, *args, **kwargs)
+
+
+class TagViewSet(CatalogViewSet):
     """Теги"""
     queryset = Tag.objects.all()
-    permission_classes = [AllowAny]
     serializer_class = TagSerializer
-    pagination_class = None
+    catalog = CatalogVersion.TAGS
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(CatalogViewSet):
     """Ингредиенты"""
     queryset = Ingredient.objects.all()
-    permission_classes = [AllowAny]
     serializer_class = IngredientSerializer
-    pagination_class = None
+    catalog = CatalogVersion.INGREDIENTS
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
 
+    def filter_queryset(self, queryset):
+        """Автодополнение по name - только для списка.
+
+        В Postgres это срез union(), его уже нельзя фильтровать по pk.
+        """
+        if self.action != 'list':
+            return queryset
+        return super().filter_queryset(queryset)
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
     """Рецепты"""
     serializer_class = RecipeSerializer
-    pagination_class = RecipePagination
+    pagination_class = RecipeCursorPagination
     http_method_names = ['get', 'post', 'patch', 'delete']
     permission_classes = [IsAuthenticatedOrReadOnly, IsOwner]
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
 
     def get_queryset(self):
-        return Recipe.objects.all().select_related(
-            'author').prefetch_related('tags', 'ingredients')
+        return Recipe.objects.with_user_flags(
+            self.request.user).with_related()
+
+    def list(self, request, *args, **kwargs):
+        fields = get_fields(request, RECIPE_FIELDS)
+        queryset = recipe_values(
+            self.filter_queryset(self.get_queryset()), fields)
+        page = self.paginate_queryset(queryset)
+        etag = recipes_etag(page, self.paginator.page_state())
+        return conditional_response(
+            request, etag,
+            lambda: self.get_paginated_response(
+                render_recipes(page, request, fields)),
+            max_age=RECIPES_MAX_AGE, personal=True)
+
+    def retrieve(self, request, *args, **kwargs):
+        fields = get_fields(request, RECIPE_FIELDS)
+        queryset = recipe_values(
+            self.filter_queryset(self.get_queryset()), fields)
+        recipe = get_object_or_404(queryset, pk=kwargs['pk'])
+        etag = recipes_etag([recipe])
+        return conditional_response(
+            request, etag,
+            lambda: Response(render_recipes([recipe], request, fields)[0]),
+            recipe['updated_at'], RECIPES_MAX_AGE, personal=True)
+
+    @action(
+        detail=False, methods=['get'], url_path='feed',
+        permission_classes=[IsAuthenticated])
+    def feed(self, request):
+        """Лента рецептов авторов из подписок, только по курсору"""
+        fields = get_fields(request, RECIPE_FIELDS)
+        ids = self.paginator.paginate_keys(
+            request,
+            lambda position, limit: feed_keys(request.user, position, limit))
+        rows = {
+            row['id']: row
+            for row in recipe_values(
+                Recipe.objects.with_user_flags(request.user).filter(
+                    pk__in=ids),
+                fields)
+        }
+        page = [rows[pk] for pk in ids if pk in rows]
+        etag = recipes_etag(page, self.paginator.page_state())
+        return conditional_response(
+            request, etag,
+            lambda: self.get_paginated_response(
+                render_recipes(page, request, fields)),
+            max_age=RECIPES_MAX_AGE, personal=True)
+
+    @action(detail=False, methods=['get'], url_path='pantry')
+    def pantry(self, request):
+        """Что приготовить из продуктов ingredients.
+
+        Сначала рецепты, для которых хватает всего, потом те, где недостает
+        одного ингредиента, и так до max_missing; внутри - новые первыми.
+        """
+        serializer = PantrySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        ingredients = serializer.validated_data['ingredients']
+        fields = get_fields(request, RECIPE_FIELDS)
+        paginator = RecipePagination()
+        matches = paginator.paginate_queryset(
+            pantry_index.search(
+                ingredients, serializer.validated_data['max_missing']),
+            request, self)
+        rows = {
+            row['id']: row
+            for row in recipe_values(
+                Recipe.objects.with_user_flags(request.user).filter(
+                    pk__in=[pk for pk, _ in matches]),
+                fields)
+        }
+        pantry_index.discard([pk for pk, _ in matches if pk not in rows])
+        page = [rows[pk] for pk, _ in matches if pk in rows]
+        missing = pantry_index.missing(rows, ingredients)
+        etag = recipes_etag(
+            page, paginator.page.paginator.count,
+            [missing[row['id']] for row in page])
+        return conditional_response(
+            request, etag,
+            lambda: paginator.get_paginated_response([
+                {**item, 'missing_ingredients': missing[row['id']]}
+                for row, item in zip(
+                    page, render_recipes(page, request, fields))
+            ]),
+            max_age=RECIPES_MAX_AGE, personal=True)
 
     def get_serializer_class(self):
         if self.action in ['list', 'retrieve']:
@@ -79,9 +203,19 @@ class RecipeViewSet(viewsets.ModelViewSet):
     @favorite.mapping.delete
     def favorite_delete(self, request, pk=None):
         """Удаление из избраного"""
-        result = get_object_or_404(Recipe, pk=pk)
-        favorite = result.favorites.filter(user=request.user)
-        return remove_method(favorite)
+        return remove_method(Recipe, request, pk, 'recipe', Favorite)
+
+    @action(
+        detail=False, methods=['post'], url_path='favorite',
+        permission_classes=[IsAuthenticated])
+    def favorite_batch(self, request):
+        """Добавление в избраное пачкой"""
+        return batch_method(Recipe, request, 'recipe', Favorite, add=True)
+
+    @favorite_batch.mapping.delete
+    def favorite_batch_delete(self, request):
+        """Удаление из избраного пачкой"""
+        return batch_method(Recipe, request, 'recipe', Favorite, add=False)
 
     @action(
         detail=True, methods=['get'], url_path='get-link',
@@ -89,8 +223,9 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def get_link(self, request, pk=None):
         """Получение короткой ссылки"""
         result = get_object_or_404(Recipe, pk=pk)
+        link = request.build_absolute_uri(f"/s/{result.short_link}/")
         return Response(
-            {"short-link": request.build_absolute_uri(f"/s/{result.link}/")},
+            {"short-link": link},
             status=status.HTTP_200_OK
         )
 
@@ -111,40 +246,39 @@ class RecipeViewSet(viewsets.ModelViewSet):
     @shopping_cart.mapping.delete
     def shopping_cart_delete(self, request, pk=None):
         """Удаление из списка покупок"""
-        result = get_object_or_404(Recipe, pk=pk)
-        basket = result.shoppingcarts.filter(user=request.user)
-        return remove_method(basket)
+        return remove_method(Recipe, request, pk, 'recipe', ShoppingCart)
 
     @action(
-        detail=False, methods=['get'], url_path='download_shopping_cart',
+        detail=False, methods=['post'], url_path='shopping_cart',
         permission_classes=[IsAuthenticated])
+    def shopping_cart_batch(self, request):
+        """Добавление в список покупок пачкой"""
+        return batch_method(
+            Recipe, request, 'recipe', ShoppingCart, add=True)
+
+    @shopping_cart_batch.mapping.delete
+    def shopping_cart_batch_delete(self, request):
+        """Удаление из списка покупок пачкой"""
+        return batch_method(
+            Recipe, request, 'recipe', ShoppingCart, add=False)
+
+    @action(
+        detail=False, methods=['get'], url_path='download_shopping_cart',
+        permission_classes=[IsAuthenticated],
+        content_negotiation_class=IgnoreFormatNegotiation)
     def download_basket(self, request):
         """Получение файла списка покупок"""
-        basket = request.user.shoppingcarts.all()
-        ingredients = {}
-
-        for result in basket:
-            recipe_ingredients = result.recipe.recipeingredients.all()
-            for ingredient in recipe_ingredients:
-                name = ingredient.ingredient.name
-                measurement_unit = ingredient.ingredient.measurement_unit
-                amount = ingredient.amount
-
-                if name in ingredients:
-                    ingredients[name]['amount'] += amount
-                else:
-                    ingredients[name] = {
-                        'measurement_unit': measurement_unit,
-                        'amount': amount,
-                    }
-
-        list_text = "Список покупок:\n"
-        for name, value in ingredients.items():
-            list_text += (
-                f"- {name} ({value['measurement_unit']}) - "
-                f"{value['amount']}\n")
-        response = HttpResponse(list_text, content_type='text/plain')
-        response['Content-Disposition'] = 'attachment; filename="list.txt"'
+        file_format = request.query_params.get('format', 'txt')
+        if file_format not in SHOPPING_LIST_FORMATS:
+            return Response(
+                {"detail": "Неизвестный формат файла."},
+                status=status.HTTP_400_BAD_REQUEST)
+        content_type, generator = SHOPPING_LIST_FORMATS[file_format]
+        items = get_items(request.user).iterator()
+        response = StreamingHttpResponse(
+            generator(items), content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="list.{file_format}"')
         return response
 
 
@@ -152,6 +286,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
 @permission_classes([AllowAny])
 def short_link(request, link):
     """Короткая ссылка"""
-    recipe = get_object_or_404(Recipe, link=link)
-    # return redirect('recipes', pk=recipe.id)
-    return redirect(f'/recipes/{recipe.id}/')
+    recipe_id = resolve_short_link(link)
+    if recipe_id is None:
+        raise Http404
+    return redirect(f'/recipes/{recipe_id}/')
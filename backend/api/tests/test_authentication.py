@@ -0,0 +1,108 @@
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.authentication import (
+    CachedTokenAuthentication, local_tokens, local_users)
+
+
+User = get_user_model()
+ME = '/api/users/me/'
+
+
+def other_process():
+    """Память процесса пуста, как в другом процессе."""
+    local_tokens.clear()
+    local_users.clear()
+
+
+class CachedTokenAuthenticationTest(TestCase):
+    """Токен и снимок пользователя из кэшей, без запросов к базе"""
+
+    def setUp(self):
+        other_process()
+        self.addCleanup(other_process)
+        self.user = User.objects.create_user(
+            username='user', email='user@example.com', password='password-1')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        location = tempfile.TemporaryDirectory()
+        self.addCleanup(location.cleanup)
+        shared = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': location.name,
+        }})
+        shared.enable()
+        self.addCleanup(shared.disable)
+
+    def authenticate(self):
+        return CachedTokenAuthentication().authenticate_credentials(
+            self.token.key)
+
+    def test_no_queries_when_cached(self):
+        self.authenticate()
+        for _ in range(2):
+            # Снимок из памяти процесса, затем из общего кэша
+            self.authenticate()
+            other_process()
+        with self.assertNumQueries(0):
+            user, token = self.authenticate()
+        self.assertEqual(
+            (user.pk, user.email, user.is_active, token.key),
+            (self.user.pk, self.user.email, True, self.token.key))
+        with self.assertNumQueries(0):
+            self.authenticate()
+
+    def test_snapshot_defers_other_fields(self):
+        self.authenticate()
+        other_process()
+        self.authenticate()
+        user, _ = self.authenticate()
+        with self.assertNumQueries(1):
+            self.assertTrue(user.check_password('password-1'))
+
+    def test_me(self):
+        self.assertEqual(self.client.get(ME).status_code, 200)
+        response = self.client.get(ME)
+        self.assertEqual(response.json()['email'], self.user.email)
+
+    def test_saved_user_gets_new_version(self):
+        self.authenticate()
+        other_process()
+        self.authenticate()
+        self.user.first_name = 'new'
+        self.user.save()
+        for _ in range(2):
+            user, _ = self.authenticate()
+            self.assertEqual(user.first_name, 'new')
+            other_process()
+
+    def test_deactivated_user_is_rejected(self):
+        self.assertEqual(self.client.get(ME).status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(ME).status_code, 401)
+        other_process()
+        self.assertEqual(self.client.get(ME).status_code, 401)
+
+    def test_deleted_token_is_rejected(self):
+        self.assertEqual(self.client.get(ME).status_code, 200)
+        response = self.client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.client.get(ME).status_code, 401)
+        other_process()
+        self.assertEqual(self.client.get(ME).status_code, 401)
+
+    def test_local_memory_cache(self):
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }}):
+            self.authenticate()
+            with self.assertNumQueries(0):
+                self.authenticate()
+            self.token.delete()
+            self.assertEqual(self.client.get(ME).status_code, 401)
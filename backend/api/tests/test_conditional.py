@@ -0,0 +1,107 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from reviews.models import CatalogVersion, Ingredient, Tag
+
+from .test_recipes import create_recipes, create_user
+
+
+class ConditionalGetTest(TestCase):
+    """ETag, Last-Modified и ответ 304"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.author = create_user('author')
+        cls.tags = [Tag.objects.create(name='Тег', slug='tag')]
+        cls.ingredients = [
+            Ingredient.objects.create(name='Ингредиент', measurement_unit='г')]
+        cls.recipes = create_recipes(
+            [cls.author], cls.tags, cls.ingredients, 2)
+        cls.recipe = cls.recipes[0]
+        cls.urls = [
+            '/api/recipes/', f'/api/recipes/{cls.recipe.pk}/',
+            '/api/tags/', f'/api/tags/{cls.tags[0].pk}/',
+            '/api/ingredients/', f'/api/ingredients/{cls.ingredients[0].pk}/',
+        ]
+
+    def setUp(self):
+        self.guest = APIClient()
+        self.reader = APIClient()
+        self.reader.force_authenticate(self.user)
+
+    def etag(self, url, client=None):
+        response = (client or self.guest).get(url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def assert_etag_changes(self, url, change, client=None):
+        etag = self.etag(url, client)
+        change()
+        self.assertNotEqual(self.etag(url, client), etag)
+
+    def test_not_modified(self):
+        for client in (self.guest, self.reader):
+            for url in self.urls:
+                with self.subTest(url=url, user=client is self.reader):
+                    etag = self.etag(url, client)
+                    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+                    self.assertEqual(response.status_code, 304)
+                    self.assertEqual(response['ETag'], etag)
+
+    def test_last_modified_not_modified(self):
+        response = self.guest.get(f'/api/recipes/{self.recipe.pk}/')
+        response = self.guest.get(
+            f'/api/recipes/{self.recipe.pk}/',
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_recipe_edit(self):
+        def edit():
+            self.recipe.name = 'Новое название'
+            self.recipe.save()
+
+        for url in self.urls[:2]:
+            with self.subTest(url=url):
+                self.assert_etag_changes(url, edit)
+
+    def test_tag_rename(self):
+        def rename():
+            self.tags[0].name = f'{self.tags[0].name}!'
+            self.tags[0].save()
+
+        for url in self.urls[:4]:
+            with self.subTest(url=url):
+                self.assert_etag_changes(url, rename)
+
+    def test_favorite_by_same_user(self):
+        url = f'/api/recipes/{self.recipe.pk}/favorite/'
+        for recipes_url in self.urls[:2]:
+            for method in ('post', 'delete'):
+                with self.subTest(method=method, url=recipes_url):
+                    self.assert_etag_changes(
+                        recipes_url,
+                        lambda: getattr(self.reader, method)(url),
+                        self.reader)
+
+    def test_catalog_bump(self):
+        for catalog, urls in (
+            (CatalogVersion.TAGS, self.urls[2:4]),
+            (CatalogVersion.INGREDIENTS, self.urls[4:]),
+        ):
+            for url in urls:
+                with self.subTest(url=url):
+                    self.assert_etag_changes(
+                        url, lambda: CatalogVersion.objects.bump(catalog))
+
+    def test_signed_in_responses_are_private(self):
+        for url in self.urls[:2]:
+            with self.subTest(url=url):
+                response = self.reader.get(url)
+                self.assertEqual(
+                    set(response['Cache-Control'].split(', ')),
+                    {'private', 'no-cache'})
+                self.assertNotIn('Last-Modified', response)
+                self.assertIn('Authorization', response['Vary'])
+                response = self.guest.get(url)
+                self.assertIn('public', response['Cache-Control'])
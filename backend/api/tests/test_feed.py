@@ -0,0 +1,130 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from reviews import feed
+from reviews.models import Ingredient, Recipe, Tag, TimelineEntry
+
+from .test_recipes import create_user
+
+
+User = get_user_model()
+
+
+def run_now(function, *args):
+    function(*args)
+
+
+@mock.patch('reviews.feed.schedule', run_now)
+class FeedTest(TestCase):
+    """Ленты подписок: рассылка, подмешивание, подписка и отписка"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user('reader')
+        cls.author = create_user('author')
+        cls.other = create_user('other')
+        cls.tags = [Tag.objects.create(name='Тег', slug='tag')]
+        cls.ingredients = [Ingredient.objects.create(
+            name='Ингредиент', measurement_unit='г')]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+        self.count = 0
+
+    def create(self, author, count):
+        recipes = []
+        for _ in range(count):
+            recipe = Recipe.objects.create(
+                name=f'Рецепт {self.count}', author=author, text='Описание',
+                cooking_time=1, image='images/recipe.png')
+            recipe.recipeingredients.create(
+                ingredient=self.ingredients[0], amount=1)
+            recipes.append(recipe)
+            self.count += 1
+        return recipes
+
+    def subscribe(self, author, method='post'):
+        response = getattr(self.client, method)(
+            f'/api/users/{author.pk}/subscribe/')
+        self.assertIn(response.status_code, (200, 201, 204))
+
+    def read(self, limit=100):
+        """Все страницы ленты по ссылкам next."""
+        ids = []
+        url = f'/api/recipes/feed/?limit={limit}'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            self.assertIsNone(data['previous'])
+            ids.extend(recipe['id'] for recipe in data['results'])
+            url = data['next']
+        return ids
+
+    def newest_first(self, recipes):
+        return [
+            recipe.pk for recipe in sorted(
+                recipes, key=lambda recipe: (recipe.created_at, recipe.pk),
+                reverse=True)
+        ]
+
+    def test_fan_out(self):
+        self.subscribe(self.author)
+        recipes = self.create(self.author, 2)
+        self.create(self.other, 1)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 2)
+        self.assertEqual(self.read(), self.newest_first(recipes))
+
+    def test_backfill_on_follow(self):
+        recipes = self.create(self.author, 3)
+        with mock.patch('reviews.feed.FEED_BACKFILL', 2):
+            self.subscribe(self.author)
+        self.assertEqual(self.read(), self.newest_first(recipes)[:2])
+
+    def test_prune_on_unfollow(self):
+        self.subscribe(self.author)
+        self.create(self.author, 2)
+        self.subscribe(self.author, 'delete')
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.reader, author=self.author).exists())
+        self.assertEqual(self.read(), [])
+
+    def test_large_author_merged_on_read(self):
+        self.subscribe(self.author)
+        self.subscribe(self.other)
+        User.objects.filter(pk=self.author.pk).update(followers_count=10)
+        with mock.patch('reviews.feed.FEED_FANOUT_LIMIT', 10):
+            large = self.create(self.author, 2)
+            small = self.create(self.other, 1)
+            self.assertTrue(TimelineEntry.objects.filter(
+                recipe__in=small).exists())
+            self.assertFalse(TimelineEntry.objects.filter(
+                recipe__in=large).exists())
+            self.assertEqual(self.read(), self.newest_first(large + small))
+
+    def test_cursor_pages_with_equal_created_at(self):
+        self.subscribe(self.author)
+        recipes = self.create(self.author, 5)
+        Recipe.objects.filter(pk__in=[
+            recipe.pk for recipe in recipes[1:4]
+        ]).update(created_at=timezone.now())
+        for recipe in recipes:
+            recipe.refresh_from_db()
+        self.assertEqual(feed.rebuild([self.reader.pk]), 5)
+        expected = self.newest_first(recipes)
+        for limit in (1, 2, 5):
+            with self.subTest(limit=limit):
+                self.assertEqual(self.read(limit), expected)
+
+    def test_rebuild(self):
+        self.subscribe(self.author)
+        recipes = self.create(self.author, 2)
+        TimelineEntry.objects.all().delete()
+        self.assertEqual(feed.rebuild(), 2)
+        self.assertEqual(self.read(), self.newest_first(recipes))
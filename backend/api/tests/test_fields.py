@@ -0,0 +1,90 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from reviews.models import Ingredient, Recipe, Tag
+
+from .test_recipes import create_recipes, create_user
+
+
+class SparseFieldsTest(TestCase):
+    """Поля ответа из параметров fields и omit"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.tag = Tag.objects.create(name='Тег', slug='tag')
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {number}', measurement_unit='г')
+            for number in range(2)
+        ]
+        cls.recipe = create_recipes(
+            [cls.user], [cls.tag], cls.ingredients, 1)[0]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_recipe_fields(self):
+        for url in ('/api/recipes/', f'/api/recipes/{self.recipe.pk}/'):
+            with self.subTest(url=url):
+                data = self.get(url, fields='name,id')
+                recipe = data['results'][0] if 'results' in data else data
+                self.assertEqual(list(recipe), ['id', 'name'])
+
+    def test_recipe_omit(self):
+        recipe = self.get(
+            f'/api/recipes/{self.recipe.pk}/', omit='text,author')
+        self.assertNotIn('text', recipe)
+        self.assertNotIn('author', recipe)
+        self.assertIn('ingredients', recipe)
+        recipe = self.get(
+            f'/api/recipes/{self.recipe.pk}/', fields='id,name', omit='name')
+        self.assertEqual(list(recipe), ['id'])
+
+    def test_user_fields(self):
+        self.assertEqual(
+            list(self.get('/api/users/me/', fields='username,id')),
+            ['id', 'username'])
+        user = self.get(f'/api/users/{self.user.pk}/', omit='avatar')
+        self.assertNotIn('avatar', user)
+        self.assertIn('email', user)
+
+    def test_unknown_names(self):
+        for url in ('/api/recipes/', f'/api/recipes/{self.recipe.pk}/',
+                    '/api/users/', '/api/users/me/'):
+            with self.subTest(url=url):
+                response = self.client.get(
+                    url, {'fields': 'id,nmae,foo', 'omit': 'txt'})
+                self.assertEqual(response.status_code, 400)
+                errors = response.json()
+                self.assertIn('foo, nmae', errors['fields'])
+                self.assertIn('txt', errors['omit'])
+
+    def test_unknown_names_on_create(self):
+        count = Recipe.objects.count()
+        response = self.client.post(
+            '/api/recipes/?fields=nmae',
+            {
+                'ingredients': [
+                    {'id': ingredient.pk, 'amount': 1}
+                    for ingredient in self.ingredients
+                ],
+                'tags': [self.tag.pk],
+                'image': (
+                    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAAB'
+                    'CAYAAAAfFcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU'
+                    '5ErkJggg=='),
+                'name': 'Новый рецепт',
+                'text': 'Описание',
+                'cooking_time': 1,
+            },
+            format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('nmae', str(response.json()['fields']))
+        self.assertEqual(Recipe.objects.count(), count)
@@ -0,0 +1,56 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import FileSystemStorage
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.images import derivatives_ready
+from reviews.models import Recipe
+
+
+User = get_user_model()
+
+
+class DerivativesTest(TestCase):
+    """Ссылки на уменьшенные копии без обращений к storage"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com',
+            password='password-1', avatar='users/avatar.png')
+        cls.recipe = Recipe.objects.create(
+            name='Рецепт', author=cls.author, text='Описание',
+            cooking_time=5, image='images/recipe.png')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = f'/api/recipes/{self.recipe.pk}/'
+
+    def test_urls_switch_after_derivatives_are_ready(self):
+        response = self.client.get(self.url)
+        self.assertTrue(
+            response.json()['image_thumbnail'].endswith('images/recipe.png'))
+        derivatives_ready(Recipe, self.recipe.pk, 'image', 'images/recipe.png')
+        derivatives_ready(User, self.author.pk, 'avatar', 'users/avatar.png')
+        ready = self.client.get(self.url)
+        self.assertNotEqual(ready['ETag'], response['ETag'])
+        data = ready.json()
+        self.assertTrue(data['image_thumbnail'].endswith(
+            'images/derivatives/recipe_thumbnail.jpg'))
+        self.assertTrue(data['image_webp'].endswith(
+            'images/derivatives/recipe_webp.webp'))
+        self.assertTrue(data['author']['avatar_thumbnail'].endswith(
+            'users/derivatives/avatar_thumbnail.jpg'))
+
+    def test_replaced_image_is_not_marked(self):
+        derivatives_ready(Recipe, self.recipe.pk, 'image', 'images/old.png')
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_derivatives, '')
+
+    def test_no_storage_calls(self):
+        with mock.patch.object(FileSystemStorage, 'exists') as exists:
+            for url in (self.url, '/api/recipes/', '/api/users/'):
+                self.assertEqual(self.client.get(url).status_code, 200)
+        exists.assert_not_called()
@@ -0,0 +1,32 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from reviews.models import Ingredient
+
+
+class IngredientTest(TestCase):
+    """Автодополнение по названию"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ingredients = [
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('соль', 'сахар', 'кислая соль')
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_list_prefix_first(self):
+        response = self.client.get('/api/ingredients/?name=сол')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item['name'] for item in response.json()],
+            ['соль', 'кислая соль'])
+
+    def test_detail_ignores_name(self):
+        ingredient = self.ingredients[1]
+        response = self.client.get(
+            f'/api/ingredients/{ingredient.pk}/?name=сол')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['name'], ingredient.name)
@@ -0,0 +1,120 @@
+import threading
+from unittest import skipUnless
+
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+
+from reviews.marks import add_marks, remove_marks
+from reviews.models import (
+    Ingredient, Recipe, ShoppingCart, ShoppingListItem, Tag)
+
+from .test_recipes import create_recipes, create_user
+
+
+class MarksMixin:
+
+    def create_data(self):
+        self.user = create_user('reader')
+        author = create_user('author')
+        tags = [Tag.objects.create(name='Тег', slug='tag')]
+        self.ingredient = Ingredient.objects.create(
+            name='Ингредиент', measurement_unit='г')
+        self.recipes = create_recipes([author], tags, [self.ingredient], 3)
+        self.ids = [recipe.pk for recipe in self.recipes]
+
+    def assert_cart(self, count):
+        self.assertEqual(
+            list(Recipe.objects.filter(pk__in=self.ids).values_list(
+                'in_carts_count', flat=True)),
+            [count] * len(self.ids))
+        self.assertEqual(
+            ShoppingListItem.objects.filter(
+                user=self.user, ingredient=self.ingredient
+            ).values_list('amount', flat=True).first() or 0,
+            2 * len(self.ids) * count)
+
+
+class MarksTest(MarksMixin, TestCase):
+    """Отметки меняют счетчики только для своих строк"""
+
+    def setUp(self):
+        self.create_data()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def batch(self, method, ids):
+        response = getattr(self.client, method)(
+            '/api/recipes/shopping_cart/', {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return {row['id']: row['result'] for row in response.json()['results']}
+
+    def test_add_and_remove(self):
+        first, *rest = self.ids
+        self.assertEqual(self.batch('post', [first]), {first: 'created'})
+        self.assertEqual(
+            self.batch('post', self.ids),
+            {first: 'exists', **{pk: 'created' for pk in rest}})
+        self.assert_cart(1)
+        self.assertEqual(
+            self.batch('delete', self.ids),
+            {pk: 'deleted' for pk in self.ids})
+        self.assertEqual(
+            self.batch('delete', self.ids),
+            {pk: 'absent' for pk in self.ids})
+        self.assert_cart(0)
+
+    def test_drifted_list_is_rebuilt(self):
+        self.batch('post', self.ids)
+        ShoppingListItem.objects.filter(user=self.user).update(amount=1)
+        with self.assertLogs('reviews.shopping_lists', 'WARNING'):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.batch('delete', self.ids[:1])
+        self.ids = self.ids[1:]
+        self.assert_cart(1)
+
+    def test_single_mark(self):
+        url = f'/api/recipes/{self.ids[0]}/favorite/'
+        self.assertEqual(self.client.post(url).status_code, 200)
+        self.assertEqual(self.client.post(url).status_code, 400)
+        self.assertEqual(
+            Recipe.objects.get(pk=self.ids[0]).favorites_count, 1)
+        self.assertEqual(self.client.delete(url).status_code, 200)
+        self.assertEqual(self.client.delete(url).status_code, 400)
+        self.assertEqual(
+            Recipe.objects.get(pk=self.ids[0]).favorites_count, 0)
+        self.assertEqual(
+            self.client.delete('/api/recipes/0/favorite/').status_code, 404)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'нужны параллельные записи')
+class ConcurrentMarksTest(MarksMixin, TransactionTestCase):
+    """Параллельные пачки не учитывают одну запись дважды"""
+
+    def setUp(self):
+        self.create_data()
+
+    def run_together(self, function):
+        barrier = threading.Barrier(2)
+
+        def worker():
+            try:
+                with transaction.atomic():
+                    barrier.wait()
+                    function(ShoppingCart, self.user, 'recipe', self.ids)
+                    # Вторая пачка пишет, пока первая не закоммичена
+                    threading.Event().wait(0.2)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_concurrent_batches(self):
+        self.run_together(add_marks)
+        self.assert_cart(1)
+        self.run_together(remove_marks)
+        self.assert_cart(0)
@@ -0,0 +1,29 @@
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from rest_framework.test import APIClient
+
+from api.metrics import MetricsMiddleware
+from reviews.models import Tag
+
+
+class MetricsMiddlewareTest(TestCase):
+    """Server-Timing с числом запросов к базе"""
+
+    def test_sync(self):
+        response = APIClient().get('/api/tags/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('queries"', response['Server-Timing'])
+
+    def test_async_chain_stays_async(self):
+        async def get_response(request):
+            await sync_to_async(Tag.objects.count)()
+            await sync_to_async(Tag.objects.exists)()
+            return HttpResponse()
+
+        middleware = MetricsMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        self.assertFalse(iscoroutinefunction(MetricsMiddleware(
+            lambda request: HttpResponse())))
+        response = async_to_sync(middleware)(RequestFactory().get('/'))
+        self.assertIn('desc="2 queries"', response['Server-Timing'])
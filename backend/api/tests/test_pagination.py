@@ -0,0 +1,99 @@
+from base64 import b64encode
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from reviews.models import Ingredient, Recipe, Tag
+
+from .test_recipes import create_recipes, create_user
+
+
+URL = '/api/recipes/'
+
+
+class RecipeCursorPaginationTest(TestCase):
+    """Выдача рецептов по курсору (created_at, id)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        tags = [Tag.objects.create(name='Тег', slug='tag')]
+        ingredients = [
+            Ingredient.objects.create(name='Ингредиент', measurement_unit='г')]
+        cls.recipes = create_recipes([cls.author], tags, ingredients, 5)
+        now = timezone.now()
+        for number, recipe in enumerate(cls.recipes):
+            # Три рецепта с одинаковым временем: порядок между ними по id
+            recipe.created_at = now - timedelta(minutes=min(number, 2))
+            Recipe.objects.filter(pk=recipe.pk).update(
+                created_at=recipe.created_at)
+        cls.expected = [
+            recipe.pk for recipe in sorted(
+                cls.recipes, key=lambda recipe: (recipe.created_at, recipe.pk),
+                reverse=True)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def get(self, url, params=None):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def read(self, limit):
+        pages = []
+        url = f'{URL}?cursor=&limit={limit}'
+        while url:
+            data = self.get(url)
+            self.assertNotIn('count', data)
+            self.assertIsNone(data['previous'])
+            pages.append([recipe['id'] for recipe in data['results']])
+            url = data['next']
+        return pages
+
+    def test_first_next_and_last_pages(self):
+        pages = self.read(2)
+        self.assertEqual(
+            pages,
+            [self.expected[0:2], self.expected[2:4], self.expected[4:]])
+
+    def test_equal_created_at_ordered_by_id(self):
+        for limit in (1, 3, 5):
+            with self.subTest(limit=limit):
+                self.assertEqual(
+                    sum(self.read(limit), []), self.expected)
+
+    def test_last_page_has_no_next(self):
+        self.assertEqual(self.read(5), [self.expected])
+
+    def test_invalid_cursor(self):
+        for cursor in ('!!!', b64encode(b'no-separator').decode(),
+                       b64encode(b'2026-01-01|x').decode()):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(f'{URL}?cursor={cursor}')
+                self.assertEqual(response.status_code, 404)
+
+    def test_without_cursor_pages_by_number(self):
+        data = self.get(f'{URL}?limit=2&page=3')
+        self.assertEqual(data['count'], 5)
+        self.assertEqual(
+            [recipe['id'] for recipe in data['results']], self.expected[4:])
+
+    def test_search_ignores_cursor(self):
+        by_text = Recipe.objects.create(
+            name='Суп', author=self.author, text='Почти борщ',
+            cooking_time=1, image='images/recipe.png')
+        by_name = Recipe.objects.create(
+            name='Борщ', author=self.author, text='Описание',
+            cooking_time=1, image='images/recipe.png')
+        Recipe.objects.filter(pk=by_name.pk).update(
+            created_at=timezone.now() - timedelta(days=1))
+        data = self.get(URL, {'search': 'борщ', 'cursor': '', 'limit': 1})
+        self.assertEqual(data['count'], 2)
+        self.assertEqual(data['results'][0]['id'], by_name.pk)
+        data = self.get(data['next'])
+        self.assertEqual(data['results'][0]['id'], by_text.pk)
+        self.assertIsNone(data['next'])
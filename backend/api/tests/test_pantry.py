@@ -0,0 +1,186 @@
+import threading
+import time
+from unittest import mock
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from project.settings import PANTRY_MAX_MISSING, PANTRY_RELOAD
+from reviews.models import Ingredient, Recipe, RecipeTombstone, Tag
+from reviews.pantry import PantryIndex, Snapshot
+
+from .test_recipes import create_recipes, create_user
+
+
+class PantryIndexTest(TestCase):
+    """Индекс подбора по продуктам"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.tags = [Tag.objects.create(name='Тег', slug='tag')]
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {number}', measurement_unit='г')
+            for number in range(3)
+        ]
+        cls.recipes = create_recipes(
+            [cls.author], cls.tags, cls.ingredients, 3)
+        cls.pantry = [ingredient.pk for ingredient in cls.ingredients]
+
+    def found(self, index):
+        matches = index.search(self.pantry, 0)
+        return [pk for pk, _ in matches[0:len(matches)]]
+
+    def test_bits_are_dense(self):
+        recipe = Recipe.objects.create(
+            id=10 ** 9, name='Новый рецепт', author=self.author,
+            text='Описание', cooking_time=1, image='images/recipe.png')
+        recipe.recipeingredients.create(
+            ingredient=self.ingredients[0], amount=1)
+        snapshot = Snapshot.load()
+        self.assertLessEqual(
+            max(mask.bit_length() for mask in snapshot.ingredients.values()),
+            Recipe.objects.count())
+        index = PantryIndex()
+        self.assertEqual(
+            self.found(index),
+            [10 ** 9] + [recipe.pk for recipe in reversed(self.recipes)])
+
+    def test_deleted_in_other_process(self):
+        index = PantryIndex()
+        self.assertEqual(len(self.found(index)), 3)
+        deleted = self.recipes[0].pk
+        # Индекс этого процесса не получает discard из сигнала удаления
+        Recipe.objects.get(pk=deleted).delete()
+        self.assertTrue(
+            RecipeTombstone.objects.filter(recipe_id=deleted).exists())
+        self.assertEqual(
+            self.found(index),
+            [recipe.pk for recipe in reversed(self.recipes[1:])])
+
+    def test_reload_does_not_block_search(self):
+        index = PantryIndex()
+        expected = self.found(index)
+        index._snapshot.loaded_at = time.monotonic() - PANTRY_RELOAD - 1
+        loading = threading.Event()
+        release = threading.Event()
+        snapshot = Snapshot.load()
+
+        def load():
+            loading.set()
+            release.wait(5)
+            return snapshot
+
+        with mock.patch.object(Snapshot, 'load', load):
+            loader = threading.Thread(target=index.load, args=(True,))
+            loader.start()
+            try:
+                self.assertTrue(loading.wait(5))
+                # Пока идет перезагрузка, поиск идет по старому снимку
+                self.assertEqual(self.found(index), expected)
+            finally:
+                release.set()
+                loader.join()
+        self.assertIs(index._snapshot, snapshot)
+
+
+class PantryEndpointTest(TestCase):
+    """Подбор рецептов по продуктам: /api/recipes/pantry/"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {number}', measurement_unit='г')
+            for number in range(4)
+        ]
+        first, second, third, fourth = cls.ingredients
+        # Недостает: 0, 1, 0, 2, 1 ингредиентов из продуктов first и second
+        cls.recipes = [
+            cls.create(number, ingredients)
+            for number, ingredients in enumerate((
+                [first], [first, third], [first, second],
+                [first, third, fourth], [second, fourth],
+            ))
+        ]
+        cls.pantry = [first.pk, second.pk]
+
+    @classmethod
+    def create(cls, number, ingredients):
+        recipe = Recipe.objects.create(
+            name=f'Рецепт {number}', author=cls.author, text='Описание',
+            cooking_time=1, image='images/recipe.png')
+        for ingredient in ingredients:
+            recipe.recipeingredients.create(ingredient=ingredient, amount=1)
+        return recipe
+
+    def setUp(self):
+        self.client = APIClient()
+        # Свой индекс, как в другом процессе: сигналы его не трогают
+        patcher = mock.patch('api.reviews.views.pantry_index', PantryIndex())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, headers=None, **params):
+        return self.client.get(
+            '/api/recipes/pantry/', {'ingredients': self.pantry, **params},
+            **(headers or {}))
+
+    def found(self, **params):
+        response = self.get(**params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [recipe['id'] for recipe in response.json()['results']]
+
+    def ids(self, *numbers):
+        return [self.recipes[number].pk for number in numbers]
+
+    def test_missing_count_then_newest(self):
+        self.assertEqual(self.found(), self.ids(2, 0, 4, 1, 3))
+
+    def test_max_missing(self):
+        self.assertEqual(self.found(max_missing=0), self.ids(2, 0))
+        self.assertEqual(self.found(max_missing=1), self.ids(2, 0, 4, 1))
+        self.assertEqual(
+            self.found(max_missing=PANTRY_MAX_MISSING),
+            self.ids(2, 0, 4, 1, 3))
+        for max_missing in (-1, PANTRY_MAX_MISSING + 1, 'x'):
+            with self.subTest(max_missing=max_missing):
+                self.assertEqual(
+                    self.get(max_missing=max_missing).status_code, 400)
+        response = self.client.get('/api/recipes/pantry/')
+        self.assertEqual(response.status_code, 400)
+
+    def test_missing_ingredients(self):
+        response = self.get()
+        self.assertEqual(
+            {
+                recipe['id']: recipe['missing_ingredients']
+                for recipe in response.json()['results']
+            },
+            {
+                self.recipes[0].pk: [],
+                self.recipes[1].pk: [self.ingredients[2].pk],
+                self.recipes[2].pk: [],
+                self.recipes[3].pk: sorted(
+                    [self.ingredients[2].pk, self.ingredients[3].pk]),
+                self.recipes[4].pk: [self.ingredients[3].pk],
+            })
+
+    def test_deleted_in_other_process(self):
+        self.assertEqual(self.get().json()['count'], 5)
+        Recipe.objects.get(pk=self.recipes[2].pk).delete()
+        response = self.get()
+        self.assertEqual(response.json()['count'], 4)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.json()['results']],
+            self.ids(0, 4, 1, 3))
+
+    def test_not_modified(self):
+        headers = {'HTTP_IF_NONE_MATCH': self.get()['ETag']}
+        self.assertEqual(self.get(headers).status_code, 304)
+        Recipe.objects.get(pk=self.recipes[2].pk).delete()
+        response = self.get(headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], headers['HTTP_IF_NONE_MATCH'])
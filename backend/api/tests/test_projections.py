@@ -0,0 +1,102 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from api.images import derivatives_ready
+from api.reviews.serializers import RecipeSerializer
+from reviews.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from users.models import Follow
+
+from .test_recipes import create_recipes, create_user
+
+
+User = get_user_model()
+
+
+class RecipeProjectionContractTest(TestCase):
+    """Ответы list и retrieve совпадают с RecipeSerializer"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user('reader')
+        cls.author = create_user('author')
+        cls.author.avatar = 'users/avatar.png'
+        cls.author.save()
+        other = create_user('other')
+        tags = [
+            Tag.objects.create(name=f'Тег {number}', slug=f'tag{number}')
+            for number in range(2)
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {number}', measurement_unit='г')
+            for number in range(3)
+        ]
+        cls.recipes = create_recipes(
+            [cls.author, other], tags, ingredients, 5)
+        derivatives_ready(User, cls.author.pk, 'avatar', 'users/avatar.png')
+        derivatives_ready(
+            Recipe, cls.recipes[0].pk, 'image', 'images/recipe.png')
+        Follow.objects.create(user=cls.reader, following=cls.author)
+        Favorite.objects.create(user=cls.reader, recipe=cls.recipes[0])
+        ShoppingCart.objects.create(user=cls.reader, recipe=cls.recipes[1])
+
+    def expected(self, user, recipes, path, fields=None):
+        request = Request(APIRequestFactory().get(path))
+        request.user = user
+        queryset = Recipe.objects.with_user_flags(user).with_related()
+        data = RecipeSerializer(
+            [queryset.get(pk=recipe.pk) for recipe in recipes], many=True,
+            context={'request': request}, fields=fields).data
+        return json.loads(JSONRenderer().render(data))
+
+    def client_for(self, user):
+        client = APIClient()
+        if user.is_authenticated:
+            client.force_authenticate(user)
+        return client
+
+    def users(self):
+        return (AnonymousUser(), self.reader, self.author)
+
+    def test_list(self):
+        recipes = sorted(
+            self.recipes, key=lambda recipe: (recipe.created_at, recipe.pk),
+            reverse=True)
+        for user in self.users():
+            with self.subTest(user=user):
+                response = self.client_for(user).get(
+                    '/api/recipes/?limit=10')
+                expected = self.expected(user, recipes, '/api/recipes/')
+                self.assertEqual(response.json()['results'], expected)
+        flags = [
+            (recipe['is_favorited'], recipe['is_in_shopping_cart'],
+             recipe['author']['is_subscribed'])
+            for recipe in self.expected(
+                self.reader, recipes, '/api/recipes/')
+        ]
+        self.assertTrue(all(any(column) for column in zip(*flags)))
+
+    def test_detail(self):
+        for user in self.users():
+            for recipe in self.recipes[:2]:
+                with self.subTest(user=user, recipe=recipe.pk):
+                    path = f'/api/recipes/{recipe.pk}/'
+                    response = self.client_for(user).get(path)
+                    self.assertEqual(
+                        [response.json()],
+                        self.expected(user, [recipe], path))
+
+    def test_sparse_fields(self):
+        fields = ['id', 'author', 'is_favorited', 'image_thumbnail']
+        path = f'/api/recipes/{self.recipes[0].pk}/'
+        response = self.client_for(self.reader).get(
+            f'{path}?fields={",".join(fields)}')
+        self.assertEqual(
+            [response.json()],
+            self.expected(self.reader, [self.recipes[0]], path, fields))
@@ -0,0 +1,124 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from reviews.models import (
+    Favorite, Ingredient, Recipe, RecipeIngredient, ShoppingCart, Tag)
+from users.models import Follow
+
+
+User = get_user_model()
+PAGE_SIZE = 10
+
+
+def create_user(name):
+    return User.objects.create_user(
+        username=name, email=f'{name}@example.com', password='password-1',
+        first_name=name, last_name=name)
+
+
+def create_recipes(authors, tags, ingredients, count):
+    recipes = []
+    for number in range(count):
+        recipe = Recipe.objects.create(
+            name=f'Рецепт {number}', author=authors[number % len(authors)],
+            text='Описание', cooking_time=number + 1,
+            image='images/recipe.png')
+        recipe.tags.set(tags[:number % len(tags) + 1])
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=2)
+            for ingredient in ingredients[:number % len(ingredients) + 1])
+        recipes.append(recipe)
+    return recipes
+
+
+class RecipeQueriesTest(TestCase):
+    """Число запросов не зависит от размера страницы"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        authors = [create_user('author1'), create_user('author2')]
+        tags = [
+            Tag.objects.create(name=f'Тег {number}', slug=f'tag{number}')
+            for number in range(3)
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {number}', measurement_unit='г')
+            for number in range(4)
+        ]
+        cls.recipes = create_recipes(
+            authors, tags, ingredients, PAGE_SIZE + 2)
+        Follow.objects.create(user=cls.user, following=authors[0])
+        for recipe in cls.recipes[:3]:
+            Favorite.objects.create(user=cls.user, recipe=recipe)
+            ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+
+    def setUp(self):
+        self.guest = APIClient()
+        self.reader = APIClient()
+        self.reader.force_authenticate(self.user)
+
+    def assert_queries(self, client, url, count):
+        with self.assertNumQueries(count):
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_list_queries_do_not_grow_with_page_size(self):
+        # count, рецепты, теги, ингредиенты
+        for client in (self.guest, self.reader):
+            with self.subTest(client=client):
+                self.assert_queries(client, '/api/recipes/?limit=1', 4)
+                response = self.assert_queries(
+                    client, f'/api/recipes/?limit={PAGE_SIZE}', 4)
+                self.assertEqual(len(response.json()['results']), PAGE_SIZE)
+
+    def test_detail_queries(self):
+        # рецепт, теги, ингредиенты
+        for client in (self.guest, self.reader):
+            with self.subTest(client=client):
+                self.assert_queries(
+                    client, f'/api/recipes/{self.recipes[-1].pk}/', 3)
+
+
+class RecipeUpdateTest(TestCase):
+    """Изменение состава рецепта меняет updated_at"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.tags = [Tag.objects.create(name='Тег', slug='tag')]
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {number}', measurement_unit='г')
+            for number in range(2)
+        ]
+        cls.recipe, = create_recipes(
+            [cls.author], cls.tags, cls.ingredients, 1)
+
+    def test_ingredients_change_updates_timestamp(self):
+        updated_at = timezone.now() - timedelta(days=1)
+        Recipe.objects.filter(pk=self.recipe.pk).update(updated_at=updated_at)
+        client = APIClient()
+        client.force_authenticate(self.author)
+        response = client.patch(
+            f'/api/recipes/{self.recipe.pk}/',
+            {
+                'tags': [self.tags[0].pk],
+                'ingredients': [
+                    {'id': ingredient.pk, 'amount': 5}
+                    for ingredient in self.ingredients],
+            },
+            format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.recipe.refresh_from_db()
+        self.assertGreater(self.recipe.updated_at, updated_at)
+        self.assertEqual(
+            set(self.recipe.recipeingredients.values_list(
+                'ingredient_id', 'amount')),
+            {(ingredient.pk, 5) for ingredient in self.ingredients})
@@ -0,0 +1,93 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from reviews.models import Ingredient, Recipe, Tag
+from reviews.search import FTS_TABLE
+
+from .test_recipes import create_recipes, create_user
+
+
+URL = '/api/recipes/'
+
+
+class RecipeSearchTest(TestCase):
+    """Поиск по названию и описанию рецептов"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.other = create_user('other')
+        cls.tags = [
+            Tag.objects.create(name=f'Тег {number}', slug=f'tag{number}')
+            for number in range(2)
+        ]
+        ingredients = [
+            Ingredient.objects.create(name='Ингредиент', measurement_unit='г')]
+        create_recipes([cls.author], cls.tags, ingredients, 2)
+        cls.by_name = cls.create(cls.author, 'Борщ', 'Описание', cls.tags[0])
+        cls.by_text = cls.create(
+            cls.author, 'Суп', 'Почти как борщ', cls.tags[0])
+        cls.other_tag = cls.create(
+            cls.author, 'Борщ зеленый', 'Описание', cls.tags[1])
+        cls.other_author = cls.create(
+            cls.other, 'Борщ красный', 'Описание', cls.tags[0])
+
+    @staticmethod
+    def create(author, name, text, tag):
+        recipe = Recipe.objects.create(
+            name=name, author=author, text=text, cooking_time=1,
+            image='images/recipe.png')
+        recipe.tags.set([tag])
+        return recipe
+
+    def found(self, **params):
+        response = APIClient().get(URL, params)
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.json()['results']]
+
+    def test_name_match_ranks_above_text_match(self):
+        found = self.found(search='борщ')
+        self.assertEqual(
+            set(found),
+            {self.by_name.pk, self.by_text.pk, self.other_tag.pk,
+             self.other_author.pk})
+        # Рецепт с совпадением в описании новее, но идет последним
+        self.assertEqual(found[-1], self.by_text.pk)
+
+    def test_with_tags_and_author(self):
+        self.assertEqual(
+            set(self.found(search='борщ', tags='tag0')),
+            {self.by_name.pk, self.by_text.pk, self.other_author.pk})
+        self.assertEqual(
+            self.found(search='борщ', tags='tag0', author=self.author.pk),
+            [self.by_name.pk, self.by_text.pk])
+        self.assertEqual(
+            self.found(search='борщ', tags='tag1', author=self.other.pk), [])
+
+    def test_reindex_after_save_and_delete(self):
+        self.by_name.name = 'Солянка'
+        self.by_name.save()
+        self.assertNotIn(self.by_name.pk, self.found(search='борщ'))
+        self.assertEqual(self.found(search='солянка'), [self.by_name.pk])
+        pk = self.by_text.pk
+        self.by_text.delete()
+        self.assertNotIn(pk, self.found(search='борщ'))
+
+    @skipUnless(connection.vendor == 'sqlite', 'Таблица FTS5 есть в SQLite')
+    def test_fts_rows_follow_recipes(self):
+        def indexed():
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT rowid, name FROM {FTS_TABLE}')
+                return dict(cursor.fetchall())
+
+        self.assertEqual(
+            indexed(), dict(Recipe.objects.values_list('id', 'name')))
+        self.by_name.name = 'Ёжик'
+        self.by_name.save()
+        self.assertEqual(indexed()[self.by_name.pk], 'Ежик')
+        pk = self.by_name.pk
+        self.by_name.delete()
+        self.assertNotIn(pk, indexed())
@@ -0,0 +1,70 @@
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.cache import shared_cache
+from api.utils import resolve_short_link, short_links
+from reviews.models import Recipe
+
+
+User = get_user_model()
+
+
+class ShortLinkTest(TestCase):
+    """Короткие ссылки и их кэши"""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            username='author', email='author@example.com',
+            password='password-1')
+        cls.recipe = Recipe.objects.create(
+            name='Рецепт', author=author, text='Описание', cooking_time=5,
+            image='images/recipe.png')
+
+    def setUp(self):
+        short_links.clear()
+
+    def test_redirect(self):
+        response = self.client.get(f'/s/{self.recipe.short_link}/')
+        self.assertRedirects(
+            response, f'/recipes/{self.recipe.pk}/',
+            fetch_redirect_response=False)
+
+    def test_stored_link_wins_over_decoding(self):
+        other = Recipe.objects.create(
+            name='Со своей ссылкой', author=self.recipe.author,
+            text='Описание', cooking_time=5, image='images/recipe.png',
+            link=self.recipe.short_link)
+        self.assertEqual(resolve_short_link(other.link), other.pk)
+
+    def test_link_is_read_only(self):
+        client = APIClient()
+        client.force_authenticate(self.recipe.author)
+        response = client.patch(
+            f'/api/recipes/{self.recipe.pk}/', {'link': 'mylink'},
+            format='json')
+        self.assertEqual(response.status_code, 200)
+        self.recipe.refresh_from_db()
+        self.assertIsNone(self.recipe.link)
+
+    def test_local_memory_cache_is_not_shared(self):
+        self.assertIsNone(shared_cache())
+
+    def test_deleted_recipe_is_forgotten_by_other_processes(self):
+        with tempfile.TemporaryDirectory() as location, override_settings(
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.'
+                           'FileBasedCache',
+                'LOCATION': location,
+            }}
+        ):
+            link = self.recipe.short_link
+            self.assertEqual(resolve_short_link(link), self.recipe.pk)
+            self.recipe.delete()
+            # У другого процесса истекла запись в памяти, общий кэш сброшен
+            short_links.clear()
+            with self.assertNumQueries(1):
+                self.assertIsNone(resolve_short_link(link))
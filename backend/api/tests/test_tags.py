@@ -0,0 +1,76 @@
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from reviews.models import TAG_BITS, Ingredient, Recipe, Tag, tags_mask
+
+from .test_recipes import create_recipes, create_user
+
+
+class TagsMaskTest(TestCase):
+    """Маска тегов рецепта вслед за recipe.tags"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags = [
+            Tag.objects.create(name=f'Тег {number}', slug=f'tag{number}')
+            for number in range(3)
+        ]
+        ingredients = [
+            Ingredient.objects.create(name='Ингредиент', measurement_unit='г')]
+        cls.recipes = create_recipes(
+            [create_user('author')], cls.tags[:1], ingredients, 2)
+
+    def assert_masks(self):
+        for recipe in Recipe.objects.all():
+            with self.subTest(recipe=recipe.pk):
+                self.assertEqual(
+                    recipe.tags_mask,
+                    tags_mask(recipe.tags.values_list('bit', flat=True)))
+
+    def test_from_recipe(self):
+        recipe = self.recipes[0]
+        recipe.tags.add(*self.tags[1:])
+        self.assert_masks()
+        recipe.tags.remove(self.tags[0])
+        self.assert_masks()
+        recipe.tags.clear()
+        self.assert_masks()
+        self.assertEqual(Recipe.objects.get(pk=recipe.pk).tags_mask, 0)
+
+    def test_from_tag(self):
+        tag = self.tags[1]
+        tag.recipes.add(*self.recipes)
+        self.assert_masks()
+        tag.recipes.remove(self.recipes[0])
+        self.assert_masks()
+        self.tags[0].recipes.clear()
+        self.assert_masks()
+        tag.recipes.clear()
+        self.assert_masks()
+
+    def test_tag_deleted(self):
+        self.recipes[0].tags.add(self.tags[1])
+        self.tags[0].delete()
+        self.assert_masks()
+
+    def test_filter_by_highest_bit(self):
+        for number in range(len(self.tags), TAG_BITS):
+            Tag.objects.create(name=f'Тег {number}', slug=f'tag{number}')
+        last = Tag.objects.get(bit=TAG_BITS - 1)
+        self.recipes[1].tags.add(last)
+        self.assert_masks()
+        response = APIClient().get('/api/recipes/', {'tags': last.slug})
+        self.assertEqual(
+            [recipe['id'] for recipe in response.json()['results']],
+            [self.recipes[1].pk])
+
+    def test_tags_limit(self):
+        for number in range(len(self.tags), TAG_BITS):
+            Tag.objects.create(name=f'Тег {number}', slug=f'tag{number}')
+        with self.assertRaises(ValidationError):
+            Tag.objects.create(name='Лишний тег', slug='extra')
+        bit = self.tags[1].bit
+        self.tags[1].delete()
+        self.assertEqual(
+            Tag.objects.create(name='Новый тег', slug='new').bit, bit)
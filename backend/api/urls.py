@@ -1,7 +1,10 @@
 from django.urls import include, path
 
+from .metrics import metrics
+
 
 urlpatterns = [
+    path('metrics/', metrics, name='metrics'),
     path('', include('api.reviews.urls')),
     path('', include('api.users.urls')),
 ]
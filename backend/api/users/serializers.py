@@ -4,6 +4,8 @@ from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 
 from project.settings import MAX_LENGT_EMAIL, MAX_LENGT_USERNAME
+from api.images import derivative_url, schedule_derivatives
+from api.utils import SparseFieldsMixin, get_recipes_limit
 from users.models import Follow
 from .validators import validate_username
 
@@ -11,20 +13,27 @@ from .validators import validate_username
 User = get_user_model()
 
 
-class UsersSerializer(serializers.ModelSerializer):
+class UsersSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализатор для /me и пользователей"""
     is_subscribed = serializers.SerializerMethodField(read_only=True)
+    avatar_thumbnail = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = User
         fields = (
             'email', 'id', 'username', 'first_name', 'last_name',
-            'is_subscribed', 'avatar')
+            'is_subscribed', 'avatar', 'avatar_thumbnail')
+
+    def get_avatar_thumbnail(self, obj):
+        return derivative_url(
+            obj.avatar, 'thumbnail', self.context.get('request'))
 
     def get_is_subscribed(self, obj):
         request = self.context.get('request')
         if not request or request.user.is_anonymous:
             return False
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         return request.user.follower.filter(following=obj).exists()
 
 
@@ -82,6 +91,11 @@ class UserAvatarSerializer(serializers.ModelSerializer):
             )
         return attrs
 
+    def update(self, instance, validated_data):
+        instance = super().update(instance, validated_data)
+        schedule_derivatives(instance.avatar)
+        return instance
+
 
 class FollowSerializer(serializers.ModelSerializer):
     """Подписчики"""
@@ -95,14 +109,17 @@ class FollowSerializer(serializers.ModelSerializer):
         source='following.last_name', read_only=True)
     is_subscribed = serializers.SerializerMethodField(read_only=True)
     recipes = serializers.SerializerMethodField(read_only=True)
-    recipes_count = serializers.IntegerField(read_only=True)
+    recipes_count = serializers.IntegerField(
+        source='following.recipes_count', read_only=True)
     avatar = serializers.SerializerMethodField(read_only=True)
+    avatar_thumbnail = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = Follow
         fields = (
             'email', 'id', 'username', 'first_name', 'last_name',
-            'is_subscribed', 'recipes', 'recipes_count', 'avatar')
+            'is_subscribed', 'recipes', 'recipes_count', 'avatar',
+            'avatar_thumbnail')
 
     def get_is_subscribed(self, obj):
         return True if obj.following else False
@@ -110,7 +127,14 @@ class FollowSerializer(serializers.ModelSerializer):
     def get_recipes(self, obj):
         """Метод для получения рецептов подписанного пользователя"""
         from api.reviews.serializers import RecipeShortSerializer
-        recipes = obj.following.recipes.all()
+        if 'recipes' in self.context:
+            recipes = self.context['recipes'][obj.following_id]
+        else:
+            recipes = obj.following.recipes.all()
+            request = self.context.get('request')
+            limit = request and get_recipes_limit(request)
+            if limit is not None:
+                recipes = recipes[:limit]
         return RecipeShortSerializer(
             recipes, many=True, context=self.context
         ).data
@@ -120,6 +144,10 @@ class FollowSerializer(serializers.ModelSerializer):
             return obj.following.avatar.url
         return None
 
+    def get_avatar_thumbnail(self, obj):
+        return derivative_url(
+            obj.following.avatar, 'thumbnail', self.context.get('request'))
+
 
 class AddFollowSerializer(serializers.ModelSerializer):
     """Добавление подписчиков"""
@@ -138,6 +166,5 @@ class AddFollowSerializer(serializers.ModelSerializer):
         return data
 
     def to_representation(self, instance):
-        instance.recipes_count = instance.following.recipes.count()
         serializer = FollowSerializer(instance, context=self.context)
         return serializer.data
@@ -1,20 +1,31 @@
 from django.contrib.auth import get_user_model
-from django.shortcuts import get_object_or_404
-from django.db.models import Count
+from django.db.models import Exists, OuterRef
 from rest_framework.response import Response
 from rest_framework.permissions import (
     IsAuthenticated, AllowAny)
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from api.utils import add_method, remove_method
+from api.images import delete_derivatives, derivative_url
+from api.utils import (
+    add_method, batch_method, remove_method, get_fields, get_recipes_limit)
 from api.pagination import RecipePagination
 from .serializers import (
     UsersSerializer, RegistrationSerializer, UserAvatarSerializer,
     FollowSerializer, AddFollowSerializer)
 from users.models import Follow
+from reviews.models import Recipe
 
 
 User = get_user_model()
+# Поле ответа: колонки пользователя, которые для него нужны
+USER_COLUMNS = {
+    'email': ('email',),
+    'username': ('username',),
+    'first_name': ('first_name',),
+    'last_name': ('last_name',),
+    'avatar': ('avatar',),
+    'avatar_thumbnail': ('avatar', 'avatar_derivatives'),
+}
 
 
 class UsersViewSet(viewsets.ModelViewSet):
@@ -23,6 +34,26 @@ class UsersViewSet(viewsets.ModelViewSet):
     permission_classes = [AllowAny]
     pagination_class = RecipePagination
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in ('list', 'retrieve'):
+            return queryset
+        fields = get_fields(self.request, UsersSerializer.Meta.fields)
+        queryset = queryset.only('id', *{
+            column for name in fields for column in USER_COLUMNS.get(name, ())
+        })
+        user = self.request.user
+        if 'is_subscribed' in fields and user.is_authenticated:
+            queryset = queryset.annotate(is_subscribed=Exists(
+                user.follower.filter(following=OuterRef('pk'))))
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action in ('list', 'retrieve', 'user_information'):
+            kwargs['fields'] = get_fields(
+                self.request, UsersSerializer.Meta.fields)
+        return super().get_serializer(*args, **kwargs)
+
     def get_serializer_class(self):
         if self.action == 'create':
             return RegistrationSerializer
@@ -46,12 +77,16 @@ class UsersViewSet(viewsets.ModelViewSet):
             user, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         serializer.save()
-        return Response({'avatar': user.avatar.url})
+        return Response({
+            'avatar': user.avatar.url,
+            'avatar_thumbnail': derivative_url(user.avatar, 'thumbnail'),
+        })
 
     @avatar.mapping.delete
     def avatar_delete(self, request):
         """Удалить аватар пользователя"""
         user = request.user
+        delete_derivatives(user.avatar)
         user.avatar.delete()
         return Response(
             {"detail": "Аватар успешно удален"},
@@ -62,12 +97,17 @@ class UsersViewSet(viewsets.ModelViewSet):
         permission_classes=[IsAuthenticated])
     def user_Follow(self, request):
         """Список подписок"""
-        follows = request.user.follower.annotate(
-            recipes_count=Count('following__recipes'))
+        follows = request.user.follower.select_related(
+            'following').order_by('id')
         paginator = self.pagination_class()
         paginated_follows = paginator.paginate_queryset(follows, request)
+        recipes = {follow.following_id: [] for follow in paginated_follows}
+        for recipe in Recipe.objects.latest_by_author(
+                recipes, get_recipes_limit(request)):
+            recipes[recipe.author_id].append(recipe)
         serializer = FollowSerializer(
-            paginated_follows, many=True, context={'request': request})
+            paginated_follows, many=True,
+            context={'request': request, 'recipes': recipes})
         return paginator.get_paginated_response(serializer.data)
 
     @action(
@@ -87,6 +127,18 @@ class UsersViewSet(viewsets.ModelViewSet):
     @subscribe.mapping.delete
     def subscribe_delete(self, request, pk=None):
         """Отписаться от пользователя"""
-        result = get_object_or_404(User, pk=pk)
-        follow = request.user.follower.filter(following=result)
-        return remove_method(follow)
+        return remove_method(User, request, pk, 'following', Follow)
+
+    @action(
+        detail=False, methods=['post'], url_path='subscribe',
+        permission_classes=[IsAuthenticated])
+    def subscribe_batch(self, request):
+        """Подписаться на пользователей пачкой"""
+        return batch_method(
+            User, request, 'following', Follow, add=True,
+            forbidden={request.user.pk})
+
+    @subscribe_batch.mapping.delete
+    def subscribe_batch_delete(self, request):
+        """Отписаться от пользователей пачкой"""
+        return batch_method(User, request, 'following', Follow, add=False)
@@ -1,51 +1,288 @@
+import csv
+import json
+
+from django.db.models import Q
 from django.shortcuts import get_object_or_404
 from rest_framework.response import Response
-from rest_framework import status
-from reviews.models import RecipeIngredient
+from rest_framework import serializers, status
+from rest_framework.settings import api_settings
+from rest_framework.validators import UniqueTogetherValidator
+from api.cache import LocalCache, shared_cache
+from project.settings import (
+    BATCH_MAX_IDS, SHORT_LINK_CACHE_SIZE, SHORT_LINK_CACHE_TIMEOUT,
+    SHORT_LINK_LOCAL_TIMEOUT)
+from reviews.links import decode_link
+from reviews.marks import add_mark, add_marks, remove_mark, remove_marks
+from reviews.models import CatalogVersion, Recipe, RecipeIngredient
+from reviews.shopping_lists import change_recipe
+
+
+short_links = LocalCache(SHORT_LINK_CACHE_SIZE, SHORT_LINK_LOCAL_TIMEOUT)
 
 
 def add_method(
     model, request, pk, serializer_class, related_field,
     model_serializer
 ):
-    """Добавление в базу"""
+    """Добавление в базу.
+
+    Один INSERT ... ON CONFLICT DO NOTHING вместо проверки уникальности,
+    ответ собирается из уже загруженного объекта.
+    """
     result = get_object_or_404(model, pk=pk)
-    data = {
-        'user': request.user.id,
-        related_field: result.id
-    }
-    serializer = serializer_class(data=data, model=model_serializer)
-    serializer.is_valid(raise_exception=True)
-    serializer.save()
+    serializer = serializer_class(
+        model=model_serializer, context={'request': request})
+    try:
+        serializer.validate({'user': request.user, related_field: result})
+    except serializers.ValidationError as error:
+        raise serializers.ValidationError(
+            serializers.as_serializer_error(error))
+    if not add_mark(model_serializer, request.user, related_field, result.pk):
+        raise unique_error(serializer)
+    serializer.instance = model_serializer(
+        user=request.user, **{related_field: result})
     return Response(serializer.data)
 
 
-def remove_method(result_delet):
-    """Метод для удаления из базы."""
-    if result_delet.exists():
-        result_delet.delete()
+def unique_error(serializer):
+    """Та же ошибка, что дает UniqueTogetherValidator сериализатора."""
+    for validator in serializer.get_validators():
+        if isinstance(validator, UniqueTogetherValidator):
+            return serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [validator.message.format(
+                    field_names=', '.join(validator.fields))]
+            }, code='unique')
+    return serializers.ValidationError('Запись уже существует.')
+
+
+def remove_method(model, request, pk, related_field, model_serializer):
+    """Метод для удаления из базы.
+
+    Один DELETE; объект ищется, только если удалять было нечего.
+    """
+    if remove_mark(model_serializer, request.user, related_field, pk):
         return Response(
             {"detail": "Успешно."},
             status=status.HTTP_200_OK)
+    get_object_or_404(model, pk=pk)
     return Response(
         {"detail": "Нет такой записи."},
         status=status.HTTP_400_BAD_REQUEST)
 
 
+class BatchSerializer(serializers.Serializer):
+    """Список id для добавления или удаления пачкой"""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False,
+        max_length=BATCH_MAX_IDS)
+
+
+def batch_method(
+    model, request, related_field, model_serializer, add, forbidden=()
+):
+    """Добавление или удаление пачкой, результат для каждого id.
+
+    Результаты: created, exists, deleted, absent (записи не было),
+    not_found (нет объекта), forbidden (id из forbidden).
+    """
+    serializer = BatchSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    ids = list(dict.fromkeys(serializer.validated_data['ids']))
+    found = set(model.objects.filter(pk__in=ids).values_list('pk', flat=True))
+    allowed = [pk for pk in ids if pk in found and pk not in forbidden]
+    if add:
+        existing = add_marks(
+            model_serializer, request.user, related_field, allowed)
+        done = {pk: 'exists' if pk in existing else 'created'
+                for pk in allowed}
+    else:
+        removed = remove_marks(
+            model_serializer, request.user, related_field, allowed)
+        done = {pk: 'deleted' if pk in removed else 'absent'
+                for pk in allowed}
+    results = [
+        {
+            'id': pk,
+            'result': done.get(pk) or (
+                'forbidden' if pk in forbidden else 'not_found'),
+        }
+        for pk in ids
+    ]
+    return Response({'results': results}, status=status.HTTP_200_OK)
+
+
 def recipe_create_and_update(recipe, ingredients_data, tags_data):
-    """Создание и обновление рецепта."""
-    if not recipe.link:
-        recipe.generate_link()
-        recipe.save()
+    """Создание и обновление рецепта.
+
+    Ингредиенты сравниваются с уже сохраненными: вставляются, изменяются и
+    удаляются только отличающиеся строки, на их разницу меняются списки
+    покупок тех, у кого рецепт в корзине. Если изменился состав, индекс
+    подбора по продуктам перечитает рецепт.
+    """
     if tags_data:
         recipe.tags.set(tags_data)
-    if ingredients_data:
-        recipe.recipeingredients.all().delete()
-        ingredients_list = [
+    if not ingredients_data:
+        return
+    amounts = {
+        ingredient['id'].id: ingredient['amount']
+        for ingredient in ingredients_data
+    }
+    to_update = []
+    to_delete = []
+    changes = {}
+    for recipe_ingredient in recipe.recipeingredients.all():
+        ingredient_id = recipe_ingredient.ingredient_id
+        amount = amounts.pop(ingredient_id, None)
+        if amount is None:
+            to_delete.append(recipe_ingredient.id)
+            changes[ingredient_id] = -recipe_ingredient.amount
+        elif amount != recipe_ingredient.amount:
+            changes[ingredient_id] = amount - recipe_ingredient.amount
+            recipe_ingredient.amount = amount
+            to_update.append(recipe_ingredient)
+    if to_delete:
+        RecipeIngredient.objects.filter(id__in=to_delete).delete()
+    if to_update:
+        RecipeIngredient.objects.bulk_update(to_update, ['amount'])
+    if amounts:
+        RecipeIngredient.objects.bulk_create(
             RecipeIngredient(
-                recipe=recipe, ingredient=ingredient['id'],
-                amount=ingredient['amount']
-            )
-            for ingredient in ingredients_data
-        ]
-        recipe.recipeingredients.bulk_create(ingredients_list)
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount)
+            for ingredient_id, amount in amounts.items()
+        )
+        changes.update(amounts)
+    if changes:
+        change_recipe(recipe.pk, changes)
+    if to_delete or amounts:
+        CatalogVersion.objects.bump(CatalogVersion.RECIPE_INGREDIENTS)
+
+
+def get_recipes_limit(request):
+    """Параметр recipes_limit из запроса."""
+    value = request.query_params.get('recipes_limit')
+    if value is None or not value.isdigit():
+        return None
+    return int(value)
+
+
+def get_fields(request, names):
+    """Поля ответа из параметров fields и omit, в порядке names.
+
+    Неизвестные имена - ошибка 400 со списком этих имен.
+    """
+    params = {
+        param: {
+            name for name in request.query_params.get(param, '').split(',')
+            if name
+        }
+        for param in ('fields', 'omit')
+    }
+    errors = {
+        param: f'Неизвестные поля: {", ".join(sorted(unknown))}.'
+        for param, unknown in (
+            (param, selected - set(names))
+            for param, selected in params.items())
+        if unknown
+    }
+    if errors:
+        raise serializers.ValidationError(errors)
+    selected = params['fields'] or set(names)
+    return [
+        name for name in names
+        if name in selected and name not in params['omit']
+    ]
+
+
+class SparseFieldsMixin:
+    """Сериализатор только с полями из аргумента fields."""
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class Echo:
+    """Буфер для csv.writer, который сразу отдает строку."""
+    def write(self, value):
+        return value
+
+
+def shopping_list_txt(items):
+    """Список покупок текстом."""
+    yield "Список покупок:\n"
+    for item in items:
+        yield (
+            f"- {item['ingredient__name']} "
+            f"({item['ingredient__measurement_unit']}) - "
+            f"{item['total_amount']}\n")
+
+
+def shopping_list_csv(items):
+    """Список покупок в CSV."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(['name', 'measurement_unit', 'amount'])
+    for item in items:
+        yield writer.writerow([
+            item['ingredient__name'],
+            item['ingredient__measurement_unit'],
+            item['total_amount']])
+
+
+def shopping_list_json(items):
+    """Список покупок в JSON."""
+    yield '['
+    separator = ''
+    for item in items:
+        yield separator + json.dumps({
+            'name': item['ingredient__name'],
+            'measurement_unit': item['ingredient__measurement_unit'],
+            'amount': item['total_amount']}, ensure_ascii=False)
+        separator = ','
+    yield ']'
+
+
+SHOPPING_LIST_FORMATS = {
+    'txt': ('text/plain', shopping_list_txt),
+    'csv': ('text/csv', shopping_list_csv),
+    'json': ('application/json', shopping_list_json),
+}
+
+
+def resolve_short_link(link):
+    """id рецепта по короткой ссылке: память процесса, общий кэш, база.
+
+    Общий кэш - только если он общий для процессов (CACHE_BACKEND).
+    """
+    recipe_id = short_links.get(link)
+    if recipe_id is not None:
+        return recipe_id
+    cache = shared_cache()
+    key = f'short-link:{link}'
+    recipe_id = cache and cache.get(key)
+    if recipe_id is None:
+        pk = decode_link(link)
+        condition = Q(link=link) if pk is None else Q(link=link) | Q(pk=pk)
+        # Ссылка, сохраненная в поле link, важнее id, расшифрованного из нее
+        recipes = sorted(
+            Recipe.objects.filter(condition).values_list('id', 'link'),
+            key=lambda recipe: recipe[1] != link)
+        if not recipes:
+            return None
+        recipe_id = recipes[0][0]
+        if cache is not None:
+            cache.set(key, recipe_id, SHORT_LINK_CACHE_TIMEOUT)
+    short_links.set(link, recipe_id)
+    return recipe_id
+
+
+def forget_short_link(link):
+    """Удаление короткой ссылки из кэшей.
+
+    Память других процессов забудет ссылку за SHORT_LINK_LOCAL_TIMEOUT.
+    """
+    short_links.delete(link)
+    cache = shared_cache()
+    if cache is not None:
+        cache.delete(f'short-link:{link}')
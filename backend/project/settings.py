@@ -7,6 +7,43 @@ import os
 load_dotenv()
 MAX_LENGT_EMAIL = 254
 MAX_LENGT_USERNAME = 150
+INGREDIENT_SEARCH_LIMIT = 10
+SHORT_LINK_CACHE_SIZE = 10000
+SHORT_LINK_CACHE_TIMEOUT = 60 * 60
+# В памяти процесса ссылка живет недолго: удаление рецепта в другом
+# процессе видно только через общий кэш
+SHORT_LINK_LOCAL_TIMEOUT = 30
+IMAGE_WORKERS = 2
+AUTH_TOKEN_CACHE_SIZE = 10000
+# В памяти процесса токен и пользователь живут недолго: смену версии
+# пользователя другие процессы видят только через общий кэш
+AUTH_TOKEN_LOCAL_TIMEOUT = 30
+# Сколько секунд общий кэш помнит id пользователя по токену и его снимок
+AUTH_TOKEN_CACHE_TIMEOUT = 5 * 60
+# Сколько секунд nginx и браузер хранят ответы без проверки ETag
+CATALOG_MAX_AGE = 5 * 60
+RECIPES_MAX_AGE = 30
+# Сколько id можно передать в одном запросе на добавление пачкой
+BATCH_MAX_IDS = 100
+# Ленты подписок: рецепты авторов, у которых подписчиков не меньше
+# FEED_FANOUT_LIMIT, не рассылаются, а читаются при выводе ленты
+FEED_WORKERS = 2
+FEED_FANOUT_LIMIT = 10000
+FEED_BATCH_SIZE = 1000
+# Сколько последних рецептов автора попадает в ленту при подписке
+FEED_BACKFILL = 200
+# Подбор рецептов по продуктам: не больше продуктов в запросе и
+# недостающих ингредиентов в ответе
+PANTRY_MAX_INGREDIENTS = 100
+PANTRY_MAX_MISSING = 5
+PANTRY_DEFAULT_MISSING = 2
+# Индекс в памяти перечитывает рецепты, измененные за столько секунд до
+# прошлой сверки, и целиком перезагружается раз в PANTRY_RELOAD секунд
+PANTRY_SYNC_MARGIN = 5 * 60
+PANTRY_RELOAD = 60 * 60
+# Сколько секунд хранятся id удаленных рецептов для индексов других
+# процессов: индекс старше PANTRY_RELOAD перезагружается целиком
+PANTRY_TOMBSTONE_KEEP = 2 * PANTRY_RELOAD
 CSRF_TRUSTED_ORIGINS = [
     'https://foot99321.zapto.org',
     'https://kasyak999.zapto.org',
@@ -16,6 +53,8 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = os.getenv('SECRET_KEY')
 DEBUG = os.getenv('DEBUG')
 ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', '').split(',')
+# Асинхронные вьюхи чтения, включаются в project/asgi.py
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS')
 
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -37,6 +76,7 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'users.UserProfile'
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -57,6 +97,16 @@ DATABASES = {
     }
 }
 
+# Общий кэш процессов (в docker compose - Redis). LocMemCache по умолчанию
+# виден только своему процессу, общий слой кэшей с ним не используется.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
 # DATABASES = {
 #     'default': {
 #         'ENGINE': 'django.db.backends.sqlite3',
@@ -108,7 +158,7 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
 
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
@@ -1,9 +1,13 @@
 from django.contrib import admin
 from django.urls import path, include
-from api.reviews.views import short_link
+from api.reviews import async_views, views
+from project.settings import ASYNC_READ_VIEWS
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
-    path('s/<str:link>/', short_link, name='short-link'),
+    path(
+        's/<str:link>/',
+        async_views.short_link if ASYNC_READ_VIEWS else views.short_link,
+        name='short-link'),
 ]
@@ -2,7 +2,8 @@ from django.contrib import admin
 from reviews.models import (
     ShoppingCart, Favorite, Ingredient, Recipe, RecipeIngredient, Tag
 )
-from django.db.models import Count
+from reviews.pantry import recipes_changed
+from reviews.shopping_lists import rebuild_for_recipes
 from django.utils.safestring import mark_safe
 from django.contrib.admin import SimpleListFilter
 
@@ -48,6 +49,13 @@ class RecipeAdmin(admin.ModelAdmin):
     list_filter = ('author', 'tags', CookingTimeFilter)
     inlines = [RecipeIngredientInline]
 
+    def save_related(self, request, form, formsets, change):
+        """Ингредиенты из инлайна меняют списки покупок и подбор."""
+        super().save_related(request, form, formsets, change)
+        if change:
+            rebuild_for_recipes([form.instance.pk])
+        recipes_changed([form.instance.pk])
+
     @admin.display(description='Время приготовления')
     def formatted_cooking_time(self, obj):
         return f"{obj.cooking_time} мин"
@@ -56,7 +64,7 @@ class RecipeAdmin(admin.ModelAdmin):
     def tags_list(self, obj):
         return ", ".join(tag.name for tag in obj.tags.all())
 
-    @admin.display(description='В избранном')
+    @admin.display(description='В избранном', ordering='favorites_count')
     def favorites_count(self, obj):
         return obj.favorites_count
 
@@ -72,8 +80,7 @@ class RecipeAdmin(admin.ModelAdmin):
 
     def get_queryset(self, request):
         result = super().get_queryset(request)
-        return result.annotate(
-            favorites_count=Count('favorites')).prefetch_related('tags')
+        return result.select_related('author').prefetch_related('tags')
 
     # def save_model(self, request, obj, form, change):
     #     # Проверяем, есть ли ингредиенты у рецепта
@@ -94,6 +101,22 @@ class IngredientAdmin(admin.ModelAdmin):
 class RecipeIngredientAdmin(admin.ModelAdmin):
     list_display = ('recipe', 'ingredient', 'amount')
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        rebuild_for_recipes([obj.recipe_id])
+        recipes_changed([obj.recipe_id])
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        rebuild_for_recipes([obj.recipe_id])
+        recipes_changed([obj.recipe_id])
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = set(queryset.values_list('recipe_id', flat=True))
+        super().delete_queryset(request, queryset)
+        rebuild_for_recipes(recipe_ids)
+        recipes_changed(recipe_ids)
+
 
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
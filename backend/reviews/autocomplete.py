@@ -0,0 +1,65 @@
+from bisect import bisect_left
+
+from django.db import connection
+from django.db.models import Case, IntegerField, Value, When
+
+from project.settings import INGREDIENT_SEARCH_LIMIT
+from reviews.models import Ingredient
+
+
+class PrefixIndex:
+    """Отсортированные названия ингредиентов в памяти процесса."""
+    def __init__(self):
+        self._data = None
+
+    def invalidate(self):
+        self._data = None
+
+    def load(self):
+        rows = sorted(
+            (name.lower(), pk)
+            for pk, name in Ingredient.objects.values_list('pk', 'name')
+        )
+        self._data = (
+            [key for key, _ in rows], [pk for _, pk in rows])
+        return self._data
+
+    def search(self, value, limit):
+        """id ингредиентов: сначала по началу названия, потом по вхождению."""
+        keys, ids = self._data or self.load()
+        value = value.lower()
+        result = []
+        position = bisect_left(keys, value)
+        while (
+            position < len(keys) and len(result) < limit
+            and keys[position].startswith(value)
+        ):
+            result.append(ids[position])
+            position += 1
+        if len(result) < limit:
+            for key, pk in zip(keys, ids):
+                if value in key and not key.startswith(value):
+                    result.append(pk)
+                    if len(result) == limit:
+                        break
+        return result
+
+
+prefix_index = PrefixIndex()
+
+
+def autocomplete(queryset, value, limit=INGREDIENT_SEARCH_LIMIT):
+    """Первые limit ингредиентов, совпадающих с началом названия выше."""
+    if connection.vendor == 'postgresql':
+        prefix = queryset.filter(name__istartswith=value).annotate(
+            rank=Value(0)).order_by('name')[:limit]
+        substring = queryset.filter(name__icontains=value).exclude(
+            name__istartswith=value).annotate(
+            rank=Value(1)).order_by('name')[:limit]
+        return prefix.union(substring, all=True).order_by(
+            'rank', 'name')[:limit]
+    ids = prefix_index.search(value, limit)
+    return queryset.filter(pk__in=ids).order_by(Case(
+        *[When(pk=pk, then=Value(rank)) for rank, pk in enumerate(ids)],
+        output_field=IntegerField()
+    ))
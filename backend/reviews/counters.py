@@ -0,0 +1,52 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+
+def increment(queryset, field):
+    """Увеличить счетчик на 1 одним UPDATE."""
+    queryset.update(**{field: F(field) + 1})
+
+
+def decrement(queryset, field):
+    """Уменьшить счетчик на 1, не опускаясь ниже нуля."""
+    queryset.update(**{field: Greatest(F(field) - 1, 0)})
+
+
+def count_subquery(model, related_field):
+    """Количество строк model, ссылающихся на внешний объект."""
+    return Coalesce(Subquery(
+        model.objects.filter(
+            **{related_field: OuterRef('pk')}
+        ).order_by().values(related_field).annotate(
+            total=Count('pk')).values('total')
+    ), 0)
+
+
+def repair(queryset, field, actual):
+    """Пересчитать счетчик там, где он разошелся с actual."""
+    drifted = queryset.annotate(actual=actual).exclude(
+        **{field: F('actual')})
+    return queryset.filter(pk__in=drifted.values('pk')).update(
+        **{field: actual})
+
+
+def repair_all(
+        recipe_model, user_model, favorite_model, cart_model,
+        follow_model=None):
+    """Пересчитать все счетчики, вернуть число исправленных строк."""
+    repaired = {
+        'favorites_count': repair(
+            recipe_model.objects.all(), 'favorites_count',
+            count_subquery(favorite_model, 'recipe')),
+        'in_carts_count': repair(
+            recipe_model.objects.all(), 'in_carts_count',
+            count_subquery(cart_model, 'recipe')),
+        'recipes_count': repair(
+            user_model.objects.all(), 'recipes_count',
+            count_subquery(recipe_model, 'author')),
+    }
+    if follow_model is not None:
+        repaired['followers_count'] = repair(
+            user_model.objects.all(), 'followers_count',
+            count_subquery(follow_model, 'following'))
+    return repaired
@@ -0,0 +1,190 @@
+"""Ленты подписок: рецепты авторов, на которых подписан пользователь.
+
+Новый рецепт рассылается в ленты подписчиков в фоне, пачками
+(fan-out on write). Рецепты авторов, у которых подписчиков не меньше
+FEED_FANOUT_LIMIT, не рассылаются, а подмешиваются при чтении ленты.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Q
+
+from project.settings import (
+    FEED_BACKFILL, FEED_BATCH_SIZE, FEED_FANOUT_LIMIT, FEED_WORKERS)
+from reviews.models import Recipe, TimelineEntry
+from users.models import Follow
+
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+executor = ThreadPoolExecutor(
+    max_workers=FEED_WORKERS, thread_name_prefix='feed')
+
+
+def _run(function, *args):
+    try:
+        function(*args)
+    except Exception:
+        logger.exception('Не удалось обновить ленты: %s%r', function, args)
+    finally:
+        connection.close()
+
+
+def schedule(function, *args):
+    """Выполнить function(*args) в фоне после коммита."""
+    transaction.on_commit(lambda: executor.submit(_run, function, *args))
+
+
+def after(queryset, position, id_field):
+    """Строки после position = (created_at, id) в порядке ленты."""
+    if position is None:
+        return queryset
+    created_at, pk = position
+    return queryset.filter(
+        Q(created_at__lte=created_at),
+        Q(created_at__lt=created_at) | Q(**{f'{id_field}__lt': pk}))
+
+
+def entries(user_id, author_id, recipes):
+    return [
+        TimelineEntry(
+            user_id=user_id, author_id=author_id, recipe_id=pk,
+            created_at=created_at)
+        for pk, created_at in recipes
+    ]
+
+
+def fan_out(recipe_id):
+    """Разослать рецепт в ленты подписчиков автора."""
+    recipe = Recipe.objects.filter(pk=recipe_id).values(
+        'author_id', 'created_at', 'author__followers_count').first()
+    if recipe is None or (
+            recipe['author__followers_count'] >= FEED_FANOUT_LIMIT):
+        return
+    followers = Follow.objects.filter(
+        following_id=recipe['author_id']).order_by('user_id')
+    last = 0
+    while True:
+        batch = list(followers.filter(user_id__gt=last).values_list(
+            'user_id', flat=True)[:FEED_BATCH_SIZE])
+        if not batch:
+            return
+        TimelineEntry.objects.bulk_create(
+            [
+                TimelineEntry(
+                    user_id=user_id, author_id=recipe['author_id'],
+                    recipe_id=recipe_id, created_at=recipe['created_at'])
+                for user_id in batch
+            ],
+            ignore_conflicts=True)
+        last = batch[-1]
+
+
+def backfill(user_id, author_id):
+    """Подписка: последние рецепты автора - в ленту читателя."""
+    if not Follow.objects.filter(
+            user_id=user_id, following_id=author_id).exists():
+        return
+    recipes = Recipe.objects.filter(author_id=author_id).order_by(
+        '-created_at', '-id').values_list('id', 'created_at')
+    TimelineEntry.objects.bulk_create(
+        entries(user_id, author_id, recipes[:FEED_BACKFILL]),
+        ignore_conflicts=True)
+
+
+def prune(user_id, author_id):
+    """Отписка: рецепты автора уходят из ленты читателя.
+
+    Если автор опустился ниже FEED_FANOUT_LIMIT, его рецепты больше не
+    подмешиваются при чтении - они рассылаются всем подписчикам.
+    """
+    if not Follow.objects.filter(
+            user_id=user_id, following_id=author_id).exists():
+        TimelineEntry.objects.filter(
+            user_id=user_id, author_id=author_id).delete()
+    if User.objects.filter(
+            pk=author_id, followers_count=FEED_FANOUT_LIMIT - 1).exists():
+        backfill_followers(author_id)
+
+
+def backfill_followers(author_id):
+    """Последние рецепты автора - в ленты всех его подписчиков."""
+    recipes = list(Recipe.objects.filter(author_id=author_id).order_by(
+        '-created_at', '-id').values_list('id', 'created_at')[:FEED_BACKFILL])
+    followers = list(Follow.objects.filter(
+        following_id=author_id).values_list('user_id', flat=True))
+    for start in range(0, len(followers), FEED_BATCH_SIZE):
+        TimelineEntry.objects.bulk_create(
+            [
+                entry
+                for user_id in followers[start:start + FEED_BATCH_SIZE]
+                for entry in entries(user_id, author_id, recipes)
+            ],
+            ignore_conflicts=True, batch_size=FEED_BATCH_SIZE)
+
+
+def follows_changed(user_id, author_ids, added):
+    """Подписки user_id на author_ids созданы или удалены."""
+    for author_id in author_ids:
+        schedule(backfill if added else prune, user_id, author_id)
+
+
+def feed_keys(user, position, limit):
+    """Ключи (created_at, id) рецептов ленты после position.
+
+    Чтение ленты по индексу (user, -created_at, -recipe) плюс рецепты
+    крупных авторов по индексу (author, -created_at, -id).
+    """
+    following = Follow.objects.filter(user=user)
+    keys = set(after(
+        TimelineEntry.objects.filter(
+            user=user, author_id__in=following.values('following_id')),
+        position, 'recipe_id'
+    ).order_by('-created_at', '-recipe_id').values_list(
+        'created_at', 'recipe_id')[:limit])
+    large = list(following.filter(
+        following__followers_count__gte=FEED_FANOUT_LIMIT
+    ).values_list('following_id', flat=True))
+    if large:
+        keys.update(after(
+            Recipe.objects.filter(author_id__in=large), position, 'id'
+        ).order_by('-created_at', '-id').values_list(
+            'created_at', 'id')[:limit])
+    return sorted(keys, reverse=True)[:limit]
+
+
+@transaction.atomic
+def rebuild(user_ids=None, batch_size=FEED_BATCH_SIZE):
+    """Пересобрать ленты заново, вернуть число записей.
+
+    Удаление и вставка в одной транзакции: читатели не видят пустых лент.
+    """
+    follows = Follow.objects.filter(
+        following__followers_count__lt=FEED_FANOUT_LIMIT)
+    if user_ids is None:
+        TimelineEntry.objects.all().delete()
+        user_ids = sorted(set(follows.values_list('user_id', flat=True)))
+    else:
+        TimelineEntry.objects.filter(user_id__in=user_ids).delete()
+    user_ids = list(user_ids)
+    total = 0
+    for start in range(0, len(user_ids), batch_size):
+        pairs = list(follows.filter(
+            user_id__in=user_ids[start:start + batch_size]
+        ).values_list('user_id', 'following_id'))
+        recipes = {author_id: [] for _, author_id in pairs}
+        for pk, created_at, author_id in Recipe.objects.latest_by_author(
+            recipes, FEED_BACKFILL
+        ).values_list('id', 'created_at', 'author_id'):
+            recipes[author_id].append((pk, created_at))
+        created = TimelineEntry.objects.bulk_create(
+            [
+                entry
+                for user_id, author_id in pairs
+                for entry in entries(user_id, author_id, recipes[author_id])
+            ],
+            batch_size=batch_size)
+        total += len(created)
+    return total
@@ -0,0 +1,35 @@
+import string
+
+
+ALPHABET = string.digits + string.ascii_letters
+LINK_LENGTH = 6
+BLOCK = len(ALPHABET) ** LINK_LENGTH
+# Множитель взаимно прост с BLOCK, поэтому перестановка обратима.
+MULTIPLIER = 0x2545F491
+OFFSET = 0x1F3D5B79
+
+
+def encode_link(pk):
+    """Короткая ссылка из id рецепта: base62 от перемешанного id.
+
+    Разные id всегда дают разные ссылки, проверять уникальность не нужно.
+    """
+    block, position = divmod(pk, BLOCK)
+    value = block * BLOCK + (position * MULTIPLIER + OFFSET) % BLOCK
+    result = ''
+    while value:
+        value, digit = divmod(value, len(ALPHABET))
+        result = ALPHABET[digit] + result
+    return result.rjust(LINK_LENGTH, ALPHABET[0])
+
+
+def decode_link(link):
+    """id рецепта из короткой ссылки, None - если ссылка не из encode_link."""
+    if len(link) < LINK_LENGTH or link.strip(ALPHABET):
+        return None
+    value = 0
+    for char in link:
+        value = value * len(ALPHABET) + ALPHABET.index(char)
+    block, position = divmod(value, BLOCK)
+    position = (position - OFFSET) * pow(MULTIPLIER, -1, BLOCK) % BLOCK
+    return block * BLOCK + position
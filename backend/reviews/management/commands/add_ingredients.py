@@ -1,18 +1,99 @@
+import csv
 import json
-from django.core.management.base import BaseCommand
-from reviews.models import Ingredient
+import sys
+import time
+from contextlib import nullcontext
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from reviews.models import CatalogVersion, Ingredient
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+def read_csv(file):
+    """Строки CSV вида: название,единица измерения."""
+    for row in csv.reader(file):
+        if not row or row == ['name', 'measurement_unit']:
+            continue
+        yield {'name': row[0], 'measurement_unit': row[1]}
+
+
+def read_json(file):
+    """Объекты из JSON-массива или JSON Lines, без чтения файла целиком."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    while True:
+        while position < len(buffer) and buffer[position] in '[], \t\r\n':
+            position += 1
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            chunk = file.read(CHUNK_SIZE)
+            if not chunk:
+                if buffer[position:].strip():
+                    raise CommandError('Файл JSON поврежден.')
+                return
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield item
+
+
+READERS = {
+    'csv': read_csv,
+    'json': read_json,
+}
 
 
 class Command(BaseCommand):
-    help = "Загрузить ингредиенты из файла JSON"
-
-    def handle(self, *args, **kwargs):
-        with open('ingredients.json', 'r', encoding='utf-8') as file:
-            data = json.load(file)
-
-        for item in data:
-            Ingredient.objects.get_or_create(
-                name=item['name'],
-                measurement_unit=item['measurement_unit']
-            )
-        print(("Ингредиенты успешно загружены!"))
+    help = "Загрузить ингредиенты из файла CSV или JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='ingredients.json',
+            help='Путь к файлу, "-" - читать из stdin')
+        parser.add_argument(
+            '--format', choices=READERS,
+            help='Формат файла, по умолчанию - по расширению')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество строк в одном INSERT')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'json')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть не меньше 1.')
+        if path == '-':
+            # stdin не наш, закрывать его не нужно
+            file = nullcontext(sys.stdin)
+        else:
+            try:
+                file = open(path, 'r', encoding='utf-8', newline='')
+            except OSError as error:
+                raise CommandError(error)
+
+        started = time.monotonic()
+        total = 0
+        with file as source:
+            items = READERS[file_format](source)
+            while batch := list(islice(items, options['batch_size'])):
+                Ingredient.objects.bulk_create(
+                    [
+                        Ingredient(
+                            name=item['name'],
+                            measurement_unit=item['measurement_unit'])
+                        for item in batch
+                    ],
+                    ignore_conflicts=True
+                )
+                total += len(batch)
+        CatalogVersion.objects.bump(CatalogVersion.INGREDIENTS)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Ингредиенты успешно загружены: {total} строк '
+            f'за {elapsed:.2f} с ({total / (elapsed or 1):.0f} строк/с).'))
@@ -0,0 +1,167 @@
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import override_settings
+from rest_framework.authtoken.models import Token
+
+from api.metrics import RequestMetrics
+from reviews.models import Ingredient, Recipe, Tag
+
+
+User = get_user_model()
+
+
+def percentile(values, share):
+    """Значение, не больше которого share отсортированных values."""
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def endpoints():
+    """Название: адрес основных эндпоинтов."""
+    recipe = Recipe.objects.first()
+    tag = Tag.objects.first()
+    ingredient = Ingredient.objects.first()
+    result = {
+        'recipes-list': '/api/recipes/',
+        'recipes-list-page': '/api/recipes/?page=10&limit=6',
+        'recipes-list-cursor': '/api/recipes/?cursor=&limit=6',
+        'recipes-favorited': '/api/recipes/?is_favorited=1',
+        'recipes-in-cart': '/api/recipes/?is_in_shopping_cart=1',
+        'tags-list': '/api/tags/',
+        'subscriptions': '/api/users/subscriptions/?recipes_limit=3',
+        'users-me': '/api/users/me/',
+        'download-shopping-cart': '/api/recipes/download_shopping_cart/',
+    }
+    if recipe:
+        result['recipes-detail'] = f'/api/recipes/{recipe.id}/'
+    if tag:
+        result['recipes-by-tag'] = f'/api/recipes/?tags={tag.slug}'
+    if ingredient:
+        result['ingredients-search'] = (
+            f'/api/ingredients/?name={ingredient.name[:3]}')
+    return result
+
+
+class Command(BaseCommand):
+    help = (
+        'Замерить задержки и количество запросов к базе основных '
+        'эндпоинтов, сравнить с сохраненными значениями')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations', type=int, default=50,
+            help='Запросов к каждому эндпоинту')
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument(
+            '--user', help='Email пользователя, по умолчанию - '
+            'пользователь с наибольшим числом подписок')
+        parser.add_argument(
+            '--endpoint', action='append',
+            help='Проверять только эти эндпоинты')
+        parser.add_argument(
+            '--baseline', help='JSON с результатами прошлого замера')
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='Записать результаты в файл --baseline')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help='Допустимый рост p95, доля от прошлого значения')
+
+    def get_user(self, email):
+        if email:
+            user = User.objects.filter(email=email).first()
+        else:
+            user = User.objects.annotate(
+                follows=Count('follower')).order_by('-follows', 'id').first()
+        if user is None:
+            raise CommandError('Пользователь не найден, выполните seed_load.')
+        return user
+
+    def measure(self, client, url, iterations, warmup):
+        for _ in range(warmup):
+            self.request(client, url)
+        latencies = []
+        queries = 0
+        started = time.perf_counter()
+        for _ in range(iterations):
+            request_started = time.perf_counter()
+            metrics = RequestMetrics()
+            with connection.execute_wrapper(metrics):
+                self.request(client, url)
+            latencies.append(time.perf_counter() - request_started)
+            queries = max(queries, metrics.queries)
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        return {
+            'p50_ms': round(percentile(latencies, 0.5) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+            'queries': queries,
+            'rps': round(iterations / elapsed, 1),
+        }
+
+    def request(self, client, url):
+        response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f'{url}: статус {response.status_code}')
+        if response.streaming:
+            b''.join(response.streaming_content)
+
+    def compare(self, results, baseline, tolerance):
+        """Список эндпоинтов, где стало хуже, чем в baseline."""
+        regressions = []
+        for name, result in results.items():
+            previous = baseline.get(name)
+            if previous is None:
+                continue
+            if result['queries'] > previous['queries']:
+                regressions.append(
+                    f'{name}: запросов к базе {previous["queries"]} -> '
+                    f'{result["queries"]}')
+            if result['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+                regressions.append(
+                    f'{name}: p95 {previous["p95_ms"]} -> '
+                    f'{result["p95_ms"]} мс')
+        return regressions
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        token, _ = Token.objects.get_or_create(user=user)
+        client = Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+        urls = endpoints()
+        if options['endpoint']:
+            unknown = set(options['endpoint']) - set(urls)
+            if unknown:
+                raise CommandError(
+                    f'Неизвестные эндпоинты: {", ".join(sorted(unknown))}')
+            urls = {name: urls[name] for name in options['endpoint']}
+
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            results = {
+                name: self.measure(
+                    client, url, options['iterations'], options['warmup'])
+                for name, url in urls.items()
+            }
+        self.stdout.write(json.dumps(results, indent=2))
+
+        path = options['baseline']
+        if path and options['save_baseline']:
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump(results, file, indent=2)
+            return
+        if path:
+            try:
+                with open(path, encoding='utf-8') as file:
+                    baseline = json.load(file)
+            except OSError as error:
+                raise CommandError(error)
+            regressions = self.compare(
+                results, baseline, options['tolerance'])
+            if regressions:
+                raise CommandError(
+                    'Результаты хуже сохраненных:\n' + '\n'.join(regressions))
@@ -0,0 +1,135 @@
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle
+from threading import Lock
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Название: (модуль приложения, дополнительные аргументы gunicorn)
+SERVERS = {
+    'wsgi': ('project.wsgi', []),
+    'asgi': ('project.asgi', ['-k', 'uvicorn.workers.UvicornWorker']),
+}
+DEFAULT_PATHS = [
+    '/api/recipes/',
+    '/api/recipes/?limit=6&page=2',
+    '/api/tags/',
+    '/api/ingredients/?name=а',
+]
+
+
+def percentile(values, share):
+    if not values:
+        return 0
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнить пропускную способность gunicorn с WSGI и ASGI '
+        'при параллельных клиентах')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--server', choices=SERVERS, action='append',
+            help='Какие серверы проверять, по умолчанию - оба')
+        parser.add_argument(
+            '--path', action='append',
+            help='Адрес для запросов, можно указать несколько раз')
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument(
+            '--concurrency', type=int, default=50,
+            help='Количество параллельных клиентов')
+        parser.add_argument(
+            '--requests', type=int, default=2000,
+            help='Количество запросов к каждому серверу')
+        parser.add_argument('--port', type=int, default=8100)
+        parser.add_argument(
+            '--token', help='Токен для запросов от имени пользователя')
+
+    def start_server(self, name, port, workers):
+        application, extra = SERVERS[name]
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+        env.pop('ASYNC_READ_VIEWS', None)
+        return subprocess.Popen(
+            [
+                sys.executable, '-m', 'gunicorn', application, *extra,
+                '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+                '--log-level', 'warning',
+            ],
+            env=env, cwd=settings.BASE_DIR)
+
+    def wait_ready(self, server, url, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError('Сервер не запустился.')
+            try:
+                urlopen(url, timeout=1).close()
+                return
+            except HTTPError:
+                return
+            except (URLError, OSError):
+                time.sleep(0.2)
+        raise CommandError('Сервер не ответил вовремя.')
+
+    def run_load(self, base_url, paths, total, concurrency, token):
+        headers = {'Authorization': f'Token {token}'} if token else {}
+        urls = cycle(base_url + path for path in paths)
+        lock = Lock()
+        latencies = []
+        errors = 0
+
+        def client():
+            nonlocal errors
+            while True:
+                with lock:
+                    if len(latencies) + errors >= total:
+                        return
+                    url = next(urls)
+                started = time.monotonic()
+                try:
+                    with urlopen(Request(url, headers=headers)) as response:
+                        response.read()
+                except (URLError, OSError):
+                    with lock:
+                        errors += 1
+                    continue
+                with lock:
+                    latencies.append(time.monotonic() - started)
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for _ in range(concurrency):
+                executor.submit(client)
+        return sorted(latencies), errors, time.monotonic() - started
+
+    def handle(self, *args, **options):
+        paths = options['path'] or DEFAULT_PATHS
+        port = options['port']
+        self.stdout.write(
+            f'{"сервер":<8}{"запросов/с":>12}{"p50, мс":>10}'
+            f'{"p95, мс":>10}{"ошибок":>8}')
+        for name in options['server'] or SERVERS:
+            base_url = f'http://127.0.0.1:{port}'
+            server = self.start_server(name, port, options['workers'])
+            try:
+                self.wait_ready(server, base_url + paths[0])
+                latencies, errors, elapsed = self.run_load(
+                    base_url, paths, options['requests'],
+                    options['concurrency'], options['token'])
+            finally:
+                server.terminate()
+                server.wait()
+            self.stdout.write(
+                f'{name:<8}{len(latencies) / elapsed:>12.1f}'
+                f'{percentile(latencies, 0.5) * 1000:>10.1f}'
+                f'{percentile(latencies, 0.95) * 1000:>10.1f}{errors:>8}')
+            port += 1
@@ -0,0 +1,27 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from api.images import derivatives_ready, make_derivatives
+from reviews.models import Recipe
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Создать уменьшенные копии уже загруженных изображений"
+
+    def handle(self, *args, **kwargs):
+        total = 0
+        for model, field in ((Recipe, 'image'), (User, 'avatar')):
+            for pk, name in model.objects.exclude(**{field: ''}).exclude(
+                **{f'{field}__isnull': True}
+            ).values_list('id', field):
+                total += 1
+                try:
+                    make_derivatives(name)
+                except (OSError, ValueError) as error:
+                    self.stderr.write(f'{name}: {error}')
+                    continue
+                derivatives_ready(model, pk, field, name)
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано изображений: {total}.'))
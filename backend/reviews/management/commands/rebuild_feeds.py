@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from reviews.feed import rebuild
+
+
+class Command(BaseCommand):
+    help = "Пересобрать ленты подписок пользователей"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'user_ids', nargs='*', type=int,
+            help='id пользователей, по умолчанию - все')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = rebuild(options['user_ids'] or None)
+        self.stdout.write(f'Записей в лентах: {total}')
+        self.stdout.write(self.style.SUCCESS('Ленты пересобраны.'))
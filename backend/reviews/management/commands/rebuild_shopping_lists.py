@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from reviews.shopping_lists import rebuild
+
+
+class Command(BaseCommand):
+    help = "Пересобрать готовые списки покупок из корзин пользователей"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'user_ids', nargs='*', type=int,
+            help='id пользователей, по умолчанию - все')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            repaired = rebuild(options['user_ids'] or None)
+        self.stdout.write(f'Исправлено строк: {repaired}')
+        self.stdout.write(self.style.SUCCESS('Списки покупок пересобраны.'))
@@ -0,0 +1,20 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from reviews.counters import repair_all
+from reviews.models import Favorite, Recipe, ShoppingCart
+from users.models import Follow
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитать счетчики избранного, списков покупок, рецептов "
+        "и подписчиков")
+
+    def handle(self, *args, **kwargs):
+        repaired = repair_all(Recipe, User, Favorite, ShoppingCart, Follow)
+        for field, count in repaired.items():
+            self.stdout.write(f'{field}: исправлено строк - {count}')
+        self.stdout.write(self.style.SUCCESS('Счетчики пересчитаны.'))
@@ -0,0 +1,171 @@
+import random
+import time
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from PIL import Image
+
+from reviews import feed
+from reviews.counters import repair_all
+from reviews.models import (
+    CatalogVersion, Favorite, Ingredient, Recipe, RecipeIngredient,
+    ShoppingCart, Tag, tags_mask)
+from reviews.search import index_recipes
+from reviews.shopping_lists import rebuild
+from users.models import Follow
+
+
+User = get_user_model()
+IMAGE_NAME = 'images/seed_load.jpg'
+DEFAULT_TAGS = [
+    ('Завтрак', 'breakfast'),
+    ('Обед', 'lunch'),
+    ('Ужин', 'dinner'),
+]
+
+
+def pick(rng, items, count):
+    """Случайные элементы без повторов, первые попадаются чаще."""
+    count = min(count, len(items))
+    result = set()
+    while len(result) < count:
+        result.add(items[int(len(items) * rng.random() ** 2)])
+    return result
+
+
+def seed_image():
+    """Одна картинка на все рецепты."""
+    if not default_storage.exists(IMAGE_NAME):
+        buffer = BytesIO()
+        Image.new('RGB', (640, 480), (200, 120, 80)).save(buffer, 'JPEG')
+        default_storage.save(IMAGE_NAME, ContentFile(buffer.getvalue()))
+    return IMAGE_NAME
+
+
+class Command(BaseCommand):
+    help = "Заполнить базу тестовыми данными для нагрузочных проверок"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument(
+            '--ingredients', type=int, default=8,
+            help='Ингредиентов в рецепте, не больше')
+        parser.add_argument(
+            '--favorites', type=int, default=20,
+            help='Рецептов в избранном у пользователя, не больше')
+        parser.add_argument(
+            '--carts', type=int, default=5,
+            help='Рецептов в списке покупок у пользователя, не больше')
+        parser.add_argument(
+            '--follows', type=int, default=10,
+            help='Подписок у пользователя, не больше')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--prefix', default='load',
+            help='Начало имен созданных пользователей и рецептов')
+
+    def bulk_create(self, model, objects):
+        self.created[model._meta.verbose_name_plural] = len(objects)
+        return model.objects.bulk_create(
+            objects, batch_size=self.batch_size)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        prefix = options['prefix']
+        self.batch_size = options['batch_size']
+        self.created = {}
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        if not ingredient_ids:
+            raise CommandError(
+                'Справочник ингредиентов пуст, выполните add_ingredients.')
+
+        started = time.monotonic()
+        with transaction.atomic():
+            tags = list(Tag.objects.all())
+            if not tags:
+                tags = self.bulk_create(Tag, [
+                    Tag(name=name, slug=slug, bit=bit)
+                    for bit, (name, slug) in enumerate(DEFAULT_TAGS)
+                ])
+                CatalogVersion.objects.bump(CatalogVersion.TAGS)
+            start = User.objects.filter(
+                username__startswith=f'{prefix}_').count()
+            password = make_password(None)
+            users = self.bulk_create(User, [
+                User(
+                    username=f'{prefix}_{number}',
+                    email=f'{prefix}_{number}@example.com',
+                    first_name='Тест', last_name=str(number),
+                    password=password)
+                for number in range(start, start + options['users'])
+            ])
+            user_ids = [user.id for user in users]
+            if not user_ids:
+                raise CommandError('Нужен хотя бы один пользователь.')
+
+            image = seed_image()
+            recipe_tags = [
+                rng.sample(tags, rng.randint(1, min(3, len(tags))))
+                for _ in range(options['recipes'])
+            ]
+            recipes = self.bulk_create(Recipe, [
+                Recipe(
+                    name=f'{prefix} {start}-{number}',
+                    author_id=rng.choice(user_ids),
+                    cooking_time=rng.randint(5, 180),
+                    image=image,
+                    text='Описание рецепта. ' * rng.randint(5, 50),
+                    tags_mask=tags_mask(tag.bit for tag in selected))
+                for number, selected in enumerate(recipe_tags)
+            ])
+            recipe_ids = [recipe.id for recipe in recipes]
+            self.bulk_create(Recipe.tags.through, [
+                Recipe.tags.through(recipe_id=recipe_id, tag_id=tag.id)
+                for recipe_id, selected in zip(recipe_ids, recipe_tags)
+                for tag in selected
+            ])
+            self.bulk_create(RecipeIngredient, [
+                RecipeIngredient(
+                    recipe_id=recipe_id, ingredient_id=ingredient_id,
+                    amount=rng.randint(1, 500))
+                for recipe_id in recipe_ids
+                for ingredient_id in rng.sample(
+                    ingredient_ids,
+                    rng.randint(1, min(options['ingredients'],
+                                       len(ingredient_ids))))
+            ])
+            if recipe_ids:
+                for model, count in (
+                    (Favorite, options['favorites']),
+                    (ShoppingCart, options['carts']),
+                ):
+                    self.bulk_create(model, [
+                        model(user_id=user_id, recipe_id=recipe_id)
+                        for user_id in user_ids
+                        for recipe_id in pick(
+                            rng, recipe_ids, rng.randint(0, count))
+                    ])
+            self.bulk_create(Follow, [
+                Follow(user_id=user_id, following_id=following_id)
+                for user_id in user_ids
+                for following_id in pick(
+                    rng, user_ids, rng.randint(0, options['follows']))
+                if following_id != user_id
+            ])
+            repair_all(Recipe, User, Favorite, ShoppingCart, Follow)
+            rebuild(user_ids)
+            CatalogVersion.objects.bump(CatalogVersion.RECIPE_INGREDIENTS)
+            feed.rebuild(user_ids)
+            index_recipes()
+
+        for name, count in self.created.items():
+            self.stdout.write(f'{name}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Данные созданы за {time.monotonic() - started:.2f} с.'))
@@ -0,0 +1,125 @@
+"""Избранное, корзина и подписки: одним INSERT или DELETE.
+
+Такие запросы не вызывают сигналов, поэтому счетчики рецептов и списки
+покупок меняются здесь, сразу для всей пачки.
+"""
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+
+from reviews import feed
+from reviews.counters import decrement, increment
+from reviews.models import Favorite, Recipe, RecipeIngredient, ShoppingCart
+from reviews.shopping_lists import change_amounts
+from users.models import Follow
+
+
+User = get_user_model()
+
+
+def cart_amounts(recipe_ids, sign):
+    """Сумма ингредиентов рецептов со знаком sign."""
+    amounts = defaultdict(int)
+    for ingredient_id, amount in RecipeIngredient.objects.filter(
+            recipe_id__in=recipe_ids).values_list('ingredient_id', 'amount'):
+        amounts[ingredient_id] += sign * amount
+    return amounts
+
+
+def favorites_changed(user, recipe_ids, added):
+    recipes = Recipe.objects.filter(pk__in=recipe_ids)
+    (increment if added else decrement)(recipes, 'favorites_count')
+
+
+def cart_changed(user, recipe_ids, added):
+    recipes = Recipe.objects.filter(pk__in=recipe_ids)
+    (increment if added else decrement)(recipes, 'in_carts_count')
+    change_amounts([user.pk], cart_amounts(recipe_ids, 1 if added else -1))
+
+
+def follows_changed(user, author_ids, added):
+    authors = User.objects.filter(pk__in=author_ids)
+    (increment if added else decrement)(authors, 'followers_count')
+    feed.follows_changed(user.pk, author_ids, added)
+
+
+# То же, что делают сигналы для одной записи
+SIDE_EFFECTS = {
+    Favorite: favorites_changed,
+    ShoppingCart: cart_changed,
+    Follow: follows_changed,
+}
+
+
+def mark_columns(model, field):
+    """Таблица и столбцы user и field модели отметок."""
+    quote = connection.ops.quote_name
+    return (quote(model._meta.db_table),) + tuple(
+        quote(model._meta.get_field(name).column) for name in ('user', field))
+
+
+def insert_marks(model, user, field, ids):
+    """INSERT ... ON CONFLICT DO NOTHING RETURNING, id созданных записей.
+
+    Повтор отсекает уникальное ограничение базы, без проверки заранее.
+    Счетчики и списки покупок меняются только для строк, которые вставил
+    этот запрос, так что параллельные запросы не учтут запись дважды.
+    """
+    table, user_column, column = mark_columns(model, field)
+    values = ', '.join(['(%s, %s)'] * len(ids))
+    params = [value for pk in ids for value in (user.pk, pk)]
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} ({user_column}, {column}) '
+                f'VALUES {values} ON CONFLICT DO NOTHING '
+                f'RETURNING {column}', params)
+            created = {row[0] for row in cursor.fetchall()}
+        if created and model in SIDE_EFFECTS:
+            SIDE_EFFECTS[model](user, sorted(created), added=True)
+    return created
+
+
+def delete_marks(model, user, field, ids):
+    """DELETE ... RETURNING, id удаленных записей.
+
+    Без Collector: сигналы для каждой строки заменяет SIDE_EFFECTS, и
+    только для строк, которые удалил этот запрос.
+    """
+    table, user_column, column = mark_columns(model, field)
+    placeholders = ', '.join(['%s'] * len(ids))
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {table} WHERE {user_column} = %s '
+                f'AND {column} IN ({placeholders}) RETURNING {column}',
+                [user.pk, *ids])
+            removed = {row[0] for row in cursor.fetchall()}
+        if removed and model in SIDE_EFFECTS:
+            SIDE_EFFECTS[model](user, sorted(removed), added=False)
+    return removed
+
+
+def add_marks(model, user, field, ids):
+    """Создать записи user -> ids, вернуть id тех, что были раньше."""
+    if not ids:
+        return set()
+    return set(ids) - insert_marks(model, user, field, ids)
+
+
+def remove_marks(model, user, field, ids):
+    """Удалить записи user -> ids одним DELETE, вернуть удаленные id."""
+    if not ids:
+        return set()
+    return delete_marks(model, user, field, ids)
+
+
+def add_mark(model, user, field, pk):
+    """Один INSERT, True - если запись создана."""
+    return bool(insert_marks(model, user, field, [pk]))
+
+
+def remove_mark(model, user, field, pk):
+    """Один DELETE, True - если запись была."""
+    return bool(delete_marks(model, user, field, [pk]))
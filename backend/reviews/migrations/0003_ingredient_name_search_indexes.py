@@ -0,0 +1,42 @@
+from django.db import migrations
+
+
+PATTERN_INDEX = (
+    'CREATE INDEX IF NOT EXISTS ingredient_name_pattern_idx '
+    'ON reviews_ingredient (UPPER(name::text) text_pattern_ops)'
+)
+TRIGRAM_INDEX = (
+    'CREATE INDEX IF NOT EXISTS ingredient_name_trgm_idx '
+    'ON reviews_ingredient USING gin (UPPER(name::text) gin_trgm_ops)'
+)
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(PATTERN_INDEX)
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(TRIGRAM_INDEX)
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS ingredient_name_trgm_idx')
+    schema_editor.execute('DROP INDEX IF EXISTS ingredient_name_pattern_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.16 on 2026-10-18 17:26
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(model, related_field):
+    """Количество строк model, ссылающихся на внешний объект."""
+    return Coalesce(Subquery(
+        model.objects.filter(
+            **{related_field: OuterRef('pk')}
+        ).order_by().values(related_field).annotate(
+            total=Count('pk')).values('total')
+    ), 0)
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model('reviews', 'Recipe')
+    Recipe.objects.update(
+        favorites_count=count_subquery(
+            apps.get_model('reviews', 'Favorite'), 'recipe'),
+        in_carts_count=count_subquery(
+            apps.get_model('reviews', 'ShoppingCart'), 'recipe'),
+    )
+    apps.get_model('users', 'UserProfile').objects.update(
+        recipes_count=count_subquery(Recipe, 'author'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_recipe_created_at_id_idx'),
+        ('users', '0002_userprofile_recipes_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В списках покупок'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.16 on 2026-10-18 18:05
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def tags_mask(bits):
+    """Маска тегов рецепта из номеров битов."""
+    mask = 0
+    for bit in bits:
+        mask |= 1 << bit
+    return mask
+
+
+def fill_tag_bits(apps, schema_editor):
+    Tag = apps.get_model('reviews', 'Tag')
+    Recipe = apps.get_model('reviews', 'Recipe')
+    tags = list(Tag.objects.order_by('id'))
+    for bit, tag in enumerate(tags):
+        tag.bit = bit
+    Tag.objects.bulk_update(tags, ['bit'])
+
+    bits = defaultdict(list)
+    for recipe_id, bit in Recipe.tags.through.objects.values_list(
+            'recipe_id', 'tag__bit'):
+        bits[recipe_id].append(bit)
+    Recipe.objects.bulk_update(
+        [
+            Recipe(pk=recipe_id, tags_mask=tags_mask(recipe_bits))
+            for recipe_id, recipe_bits in bits.items()
+        ],
+        ['tags_mask'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tag',
+            name='bit',
+            field=models.PositiveSmallIntegerField(editable=False, null=True, unique=True, verbose_name='Бит в маске тегов'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='tags_mask',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='Маска тегов'),
+        ),
+        migrations.RunPython(fill_tag_bits, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='tag',
+            name='bit',
+            field=models.PositiveSmallIntegerField(editable=False, unique=True, verbose_name='Бит в маске тегов'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+from django.db import migrations
+
+
+# Postgres: вычисляемая колонка reviews_recipe.search_vector с GIN-индексом
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('russian', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(text, '')), 'B')"
+)
+# SQLite: отдельная таблица FTS5, дальше ее обновляют сигналы
+FTS_TABLE = 'reviews_recipe_fts'
+
+
+def create_search(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'ALTER TABLE reviews_recipe ADD COLUMN IF NOT EXISTS '
+            f'search_vector tsvector GENERATED ALWAYS AS ({SEARCH_VECTOR}) '
+            'STORED')
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS recipe_search_vector_idx '
+            'ON reviews_recipe USING gin (search_vector)')
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} '
+            'USING fts5(name, text)')
+        schema_editor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, text) '
+            "SELECT id, replace(replace(name, 'ё', 'е'), 'Ё', 'Е'), "
+            "replace(replace(text, 'ё', 'е'), 'Ё', 'Е') FROM reviews_recipe")
+
+
+def drop_search(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS recipe_search_vector_idx')
+        schema_editor.execute(
+            'ALTER TABLE reviews_recipe DROP COLUMN IF EXISTS search_vector')
+    elif vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_tag_bits'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search, drop_search),
+    ]
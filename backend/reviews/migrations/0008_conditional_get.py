@@ -0,0 +1,43 @@
+# Generated by Django 4.2.16 on 2026-10-18 21:40
+
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+
+def fill_versions(apps, schema_editor):
+    Recipe = apps.get_model('reviews', 'Recipe')
+    CatalogVersion = apps.get_model('reviews', 'CatalogVersion')
+    Recipe.objects.update(updated_at=F('created_at'))
+    for name in ('tags', 'ingredients'):
+        CatalogVersion.objects.get_or_create(name=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_recipe_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, help_text='Меняется и при изменении тегов, ингредиентов и автора', verbose_name='Изменено'),
+            preserve_default=False,
+        ),
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=32, unique=True, verbose_name='Справочник')),
+                ('version', models.PositiveIntegerField(default=0, verbose_name='Версия')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Изменено')),
+            ],
+            options={
+                'verbose_name': 'версия справочника',
+                'verbose_name_plural': 'Версии справочников',
+            },
+        ),
+        migrations.RunPython(fill_versions, migrations.RunPython.noop),
+    ]
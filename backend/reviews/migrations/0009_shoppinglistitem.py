@@ -0,0 +1,52 @@
+# Generated by Django 4.2.16 on 2026-10-18 22:30
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+import django.db.models.deletion
+
+
+def fill_shopping_lists(apps, schema_editor):
+    RecipeIngredient = apps.get_model('reviews', 'RecipeIngredient')
+    ShoppingListItem = apps.get_model('reviews', 'ShoppingListItem')
+    ShoppingListItem.objects.bulk_create(
+        [
+            ShoppingListItem(
+                user_id=user_id, ingredient_id=ingredient_id, amount=total)
+            for user_id, ingredient_id, total in RecipeIngredient.objects.values_list(
+                'recipe__shoppingcarts__user_id', 'ingredient_id'
+            ).filter(
+                recipe__shoppingcarts__isnull=False
+            ).annotate(total=Sum('amount')).order_by()
+        ],
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('reviews', '0008_conditional_get'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveIntegerField(default=0, verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='reviews.ingredient', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'строка списка покупок',
+                'verbose_name_plural': 'Строки списков покупок',
+                'default_related_name': 'shopping_list_items',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppinglistitem',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_user_shopping_list_ingredient'),
+        ),
+        migrations.RunPython(fill_shopping_lists, migrations.RunPython.noop),
+    ]
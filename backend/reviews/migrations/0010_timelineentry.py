@@ -0,0 +1,92 @@
+# Generated by Django 4.2.16 on 2026-10-18 23:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_timelines(apps, schema_editor):
+    """Ленты по подпискам: последние рецепты автора, пачками.
+
+    Подписки читаются потоком по автору, в памяти - рецепты одного автора
+    и одна пачка записей.
+    """
+    Follow = apps.get_model('users', 'Follow')
+    Recipe = apps.get_model('reviews', 'Recipe')
+    TimelineEntry = apps.get_model('reviews', 'TimelineEntry')
+    backfill = getattr(settings, 'FEED_BACKFILL', 200)
+    fanout_limit = getattr(settings, 'FEED_FANOUT_LIMIT', 10000)
+    batch_size = getattr(settings, 'FEED_BATCH_SIZE', 1000)
+    author_id = recipes = None
+    entries = []
+    for user_id, following_id in Follow.objects.filter(
+            following__followers_count__lt=fanout_limit
+    ).order_by('following_id', 'user_id').values_list(
+            'user_id', 'following_id').iterator(chunk_size=batch_size):
+        if following_id != author_id:
+            author_id = following_id
+            recipes = list(Recipe.objects.filter(
+                author_id=author_id
+            ).order_by('-created_at', '-id').values_list(
+                'id', 'created_at')[:backfill])
+        entries.extend(
+            TimelineEntry(
+                user_id=user_id, author_id=author_id, recipe_id=pk,
+                created_at=created_at)
+            for pk, created_at in recipes)
+        if len(entries) >= batch_size:
+            TimelineEntry.objects.bulk_create(entries, batch_size=batch_size)
+            entries = []
+    TimelineEntry.objects.bulk_create(entries, batch_size=batch_size)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('reviews', '0009_shoppinglistitem'),
+        ('users', '0003_userprofile_followers_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(verbose_name='Добавлено')),
+            ],
+            options={
+                'verbose_name': 'запись ленты',
+                'verbose_name_plural': 'Ленты подписок',
+                'default_related_name': 'timeline_entries',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-created_at', '-id'], name='recipe_author_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='timelineentry',
+            name='author',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор'),
+        ),
+        migrations.AddField(
+            model_name='timelineentry',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='reviews.recipe', verbose_name='Рецепт'),
+        ),
+        migrations.AddField(
+            model_name='timelineentry',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Читатель'),
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', '-created_at', '-recipe'], name='timeline_user_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_user_timeline_recipe'),
+        ),
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
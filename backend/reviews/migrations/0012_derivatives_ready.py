@@ -0,0 +1,47 @@
+# Generated by Django 4.2.16 on 2026-10-18 18:17
+
+import posixpath
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+
+# Уменьшенные копии на момент миграции: название и расширение файла
+DERIVATIVES = (('thumbnail', 'jpg'), ('webp', 'webp'))
+
+
+def derivatives_exist(name):
+    """Все уменьшенные копии файла name уже сохранены."""
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    return all(
+        default_storage.exists(posixpath.join(
+            directory, 'derivatives', f'{stem}_{kind}.{extension}'))
+        for kind, extension in DERIVATIVES
+    )
+
+
+def fill_ready(apps, schema_editor):
+    """Копии, созданные до появления поля, уже лежат в storage."""
+    Recipe = apps.get_model('reviews', 'Recipe')
+    for pk, name in Recipe.objects.exclude(image='').exclude(
+        image__isnull=True
+    ).values_list('id', 'image').iterator():
+        if derivatives_exist(name):
+            Recipe.objects.filter(pk=pk).update(image_derivatives=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0011_recipe_updated_at_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_derivatives',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100, verbose_name='Уменьшенные копии готовы для'),
+        ),
+        migrations.RunPython(fill_ready, migrations.RunPython.noop),
+    ]
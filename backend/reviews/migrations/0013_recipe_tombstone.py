@@ -0,0 +1,25 @@
+# Generated by Django 4.2.16 on 2026-10-18 18:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0012_derivatives_ready'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipe_id', models.BigIntegerField(verbose_name='id рецепта')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Удален')),
+            ],
+            options={
+                'verbose_name': 'удаленный рецепт',
+                'verbose_name_plural': 'Удаленные рецепты',
+            },
+        ),
+    ]
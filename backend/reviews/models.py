@@ -1,8 +1,13 @@
-import uuid
 from django.db import models
+from django.db.models import Exists, F, OuterRef, Prefetch, Window
+from django.db.models.functions import RowNumber
 from django.contrib.auth import get_user_model
 from project.settings import MAX_LENGT_USERNAME
+from reviews.links import encode_link
+from users.models import Follow
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 
 
 User = get_user_model()
@@ -20,6 +25,16 @@ WEIGHT_UNITS = [
     ('веточка', 'веточка'),
     ('батон', 'батон')
 ]
+# Маска тегов хранится в BigIntegerField, старший бит занят знаком
+TAG_BITS = 63
+
+
+def tags_mask(bits):
+    """Маска тегов рецепта из номеров битов."""
+    mask = 0
+    for bit in bits:
+        mask |= 1 << bit
+    return mask
 
 
 class PublishedModel(models.Model):
@@ -46,6 +61,8 @@ class Tag(models.Model):
             "цифры, дефис и подчёркивание."
         )
     )
+    bit = models.PositiveSmallIntegerField(
+        unique=True, editable=False, verbose_name='Бит в маске тегов')
 
     class Meta:
         """Перевод модели"""
@@ -56,6 +73,69 @@ class Tag(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if self.bit is None:
+            used = set(Tag.objects.values_list('bit', flat=True))
+            free = [bit for bit in range(TAG_BITS) if bit not in used]
+            if not free:
+                raise ValidationError(
+                    f'Нельзя создать больше {TAG_BITS} тегов.')
+            self.bit = free[0]
+        super().save(*args, **kwargs)
+
+
+class CatalogVersionQuerySet(models.QuerySet):
+    """Версии справочников"""
+
+    def bump(self, name):
+        """Новая версия справочника name после любого изменения."""
+        if not self.filter(name=name).update(
+                version=F('version') + 1, updated_at=timezone.now()):
+            self.get_or_create(name=name, defaults={'version': 1})
+
+    def current(self, name):
+        """Версия и время изменения справочника name."""
+        return self.filter(name=name).values_list(
+            'version', 'updated_at').first() or (0, None)
+
+
+class CatalogVersion(models.Model):
+    """Версия справочника для ETag и Last-Modified"""
+    TAGS = 'tags'
+    INGREDIENTS = 'ingredients'
+    RECIPE_INGREDIENTS = 'recipe_ingredients'
+
+    name = models.CharField(
+        max_length=32, unique=True, verbose_name='Справочник')
+    version = models.PositiveIntegerField(default=0, verbose_name='Версия')
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name='Изменено')
+
+    objects = CatalogVersionQuerySet.as_manager()
+
+    class Meta:
+        """Перевод модели"""
+        verbose_name = 'версия справочника'
+        verbose_name_plural = 'Версии справочников'
+
+    def __str__(self):
+        return f'{self.name} v{self.version}'
+
+
+class RecipeTombstone(models.Model):
+    """Удаленный рецепт для индексов подбора по продуктам других процессов"""
+    recipe_id = models.BigIntegerField(verbose_name='id рецепта')
+    deleted_at = models.DateTimeField(
+        auto_now_add=True, db_index=True, verbose_name='Удален')
+
+    class Meta:
+        """Перевод модели"""
+        verbose_name = 'удаленный рецепт'
+        verbose_name_plural = 'Удаленные рецепты'
+
+    def __str__(self):
+        return f'{self.recipe_id}'
+
 
 class Ingredient(models.Model):
     """Ингредиент"""
@@ -81,6 +161,53 @@ class Ingredient(models.Model):
         return f"{self.name} ({self.measurement_unit})"
 
 
+class RecipeQuerySet(models.QuerySet):
+    """Запросы к рецептам"""
+
+    def with_user_flags(self, user):
+        """Флаги избранного, списка покупок и подписки на автора."""
+        if not user.is_authenticated:
+            return self
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            author_is_subscribed=Exists(Follow.objects.filter(
+                user=user, following=OuterRef('author'))),
+        )
+
+    def latest_by_author(self, author_ids, limit=None):
+        """Последние рецепты авторов, не больше limit на автора."""
+        result = self.filter(author_id__in=author_ids)
+        if limit is None:
+            return result
+        return result.annotate(
+            row_number=Window(
+                RowNumber(),
+                partition_by=F('author'),
+                order_by=(F('created_at').desc(), F('id').desc())
+            )
+        ).filter(row_number__lte=limit)
+
+    def with_any_tags(self, mask):
+        """Рецепты, у которых есть хотя бы один тег из маски."""
+        return self.alias(
+            tags_matched=F('tags_mask').bitand(mask)
+        ).exclude(tags_matched=0)
+
+    def with_related(self):
+        """Автор, теги и ингредиенты одним набором запросов."""
+        return self.select_related('author').prefetch_related(
+            'tags',
+            Prefetch(
+                'recipeingredients',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredient')
+            )
+        )
+
+
 class Recipe(models.Model):
     """Рецепт"""
     name = models.CharField(
@@ -89,6 +216,8 @@ class Recipe(models.Model):
         User, on_delete=models.CASCADE,
         verbose_name='Автор публикации')
     tags = models.ManyToManyField(Tag, verbose_name='Теги')
+    tags_mask = models.BigIntegerField(
+        default=0, editable=False, verbose_name='Маска тегов')
     ingredients = models.ManyToManyField(
         Ingredient,
         verbose_name='Ингредиенты',
@@ -105,21 +234,41 @@ class Recipe(models.Model):
     created_at = models.DateTimeField(
         auto_now_add=True, verbose_name='Добавлено'
     )
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name='Изменено',
+        help_text='Меняется и при изменении тегов, ингредиентов и автора')
     image = models.ImageField(upload_to='images/', verbose_name='Картинка')
+    image_derivatives = models.CharField(
+        max_length=100, blank=True, default='', editable=False,
+        verbose_name='Уменьшенные копии готовы для')
     text = models.TextField(verbose_name='Текстовое описание')
+    favorites_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='В избранном')
+    in_carts_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='В списках покупок')
 
-    def generate_link(self):
-        """Генерация ссылки"""
-        self.link = uuid.uuid4().hex[:5]
-        while Recipe.objects.filter(link=self.link).exists():
-            self.link = uuid.uuid4().hex[:5]
+    objects = RecipeQuerySet.as_manager()
+
+    @property
+    def short_link(self):
+        """Сохраненная ранее ссылка или ссылка из id рецепта"""
+        return self.link or encode_link(self.pk)
 
     class Meta:
         """Перевод модели"""
         verbose_name = 'рецепт'
         verbose_name_plural = 'Рецепты'
         default_related_name = 'recipes'
-        ordering = ('-created_at',)
+        ordering = ('-created_at', '-id')
+        indexes = [
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='recipe_created_at_id_idx'),
+            models.Index(
+                fields=['author', '-created_at', '-id'],
+                name='recipe_author_created_idx'),
+            models.Index(fields=['updated_at'], name='recipe_updated_at_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -184,3 +333,57 @@ class ShoppingCart(PublishedModel):
 
     def __str__(self):
         return f'{self.user}'
+
+
+class ShoppingListItem(models.Model):
+    """Сумма ингредиента по всем рецептам из списка покупок"""
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, verbose_name='Пользователь')
+    ingredient = models.ForeignKey(
+        Ingredient, on_delete=models.CASCADE, verbose_name='Ингредиент')
+    amount = models.PositiveIntegerField(
+        default=0, verbose_name='Количество')
+
+    class Meta:
+        """Перевод модели"""
+        verbose_name = 'строка списка покупок'
+        verbose_name_plural = 'Строки списков покупок'
+        default_related_name = 'shopping_list_items'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_user_shopping_list_ingredient')
+        ]
+
+    def __str__(self):
+        return f'{self.user}: {self.ingredient} - {self.amount}'
+
+
+class TimelineEntry(models.Model):
+    """Рецепт в ленте подписок пользователя"""
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, verbose_name='Читатель')
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, verbose_name='Рецепт')
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='+',
+        verbose_name='Автор')
+    created_at = models.DateTimeField(verbose_name='Добавлено')
+
+    class Meta:
+        """Перевод модели"""
+        verbose_name = 'запись ленты'
+        verbose_name_plural = 'Ленты подписок'
+        default_related_name = 'timeline_entries'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'], name='unique_user_timeline_recipe')
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-created_at', '-recipe'],
+                name='timeline_user_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user}: {self.recipe}'
@@ -0,0 +1,313 @@
+"""Подбор рецептов по продуктам: что можно приготовить из того, что есть.
+
+Индекс в памяти процесса хранит битовые маски рецептов: для каждого
+ингредиента и для каждого числа ингредиентов в рецепте. Биты - плотные
+номера рецептов в индексе, а не их id, так что длина маски не больше числа
+рецептов. Сколько продуктов есть в каждом рецепте, считается поразрядным
+сложением масок продуктов, без обхода рецептов в Python.
+
+Память процесса: маска на каждый ингредиент и размер рецепта, каждая не
+длиннее числа рецептов в битах, и кортеж ингредиентов на рецепт. На 100 000
+рецептов и 2 000 ингредиентов это около 25 МБ масок и 20 МБ кортежей.
+Номера удаленных рецептов освобождаются при полной перезагрузке.
+
+Процессы узнают об изменениях по версии CatalogVersion.RECIPE_INGREDIENTS:
+перечитывают рецепты, измененные после прошлой сверки, и убирают рецепты
+из RecipeTombstone. Полная перезагрузка строит новый индекс без блокировки
+и подменяет им старый, поиски в это время идут по старому.
+"""
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.utils import timezone
+
+from project.settings import (
+    PANTRY_RELOAD, PANTRY_SYNC_MARGIN, PANTRY_TOMBSTONE_KEEP)
+from reviews.models import (
+    CatalogVersion, Recipe, RecipeIngredient, RecipeTombstone)
+
+
+BYTE_BITS = [bin(byte).count('1') for byte in range(256)]
+
+
+def to_bits(ids):
+    """Маска с единицами в битах ids."""
+    ids = list(ids)
+    if not ids:
+        return 0
+    data = bytearray(max(ids) // 8 + 1)
+    for pk in ids:
+        data[pk >> 3] |= 1 << (pk & 7)
+    return int.from_bytes(data, 'little')
+
+
+def positions(bits, start, stop):
+    """Номера единичных битов с start-го по stop-й, от старших к младшим."""
+    result = []
+    if start >= stop:
+        return result
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, 'big')
+    last = len(data) - 1
+    found = 0
+    for index, byte in enumerate(data):
+        if not byte:
+            continue
+        if found + BYTE_BITS[byte] <= start:
+            found += BYTE_BITS[byte]
+            continue
+        base = (last - index) * 8
+        for bit in range(7, -1, -1):
+            if byte >> bit & 1:
+                if found >= start:
+                    result.append(base + bit)
+                found += 1
+                if found == stop:
+                    return result
+    return result
+
+
+def add(planes, bits):
+    """Прибавить 1 к счетчикам рецептов из bits.
+
+    Счетчик рецепта - его биты в масках planes, младший разряд первый.
+    """
+    carry = bits
+    for index, plane in enumerate(planes):
+        planes[index] = plane ^ carry
+        carry &= plane
+        if not carry:
+            return
+    planes.append(carry)
+
+
+def equal(planes, value):
+    """Маска рецептов со счетчиком value, ее пересекают с маской размера."""
+    if value >> len(planes):
+        return 0
+    result = -1
+    for index, plane in enumerate(planes):
+        result &= plane if value >> index & 1 else ~plane
+    return result
+
+
+class Matches:
+    """id рецептов и число недостающих ингредиентов, по возрастанию числа.
+
+    Для Paginator: длина считается по маскам, срез выбирает только свои id.
+    pks - id по номерам битов, в него только добавляют, так что номера
+    из масок не меняют смысла после поиска.
+    """
+    def __init__(self, groups, pks):
+        self.groups = [
+            (missing, bits, bin(bits).count('1'))
+            for missing, bits in groups if bits
+        ]
+        self.count = sum(count for _, _, count in self.groups)
+        self.pks = pks
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        start, stop, _ = index.indices(self.count)
+        result = []
+        for missing, bits, count in self.groups:
+            if stop <= 0:
+                break
+            result.extend(
+                (self.pks[bit], missing)
+                for bit in positions(bits, start, min(stop, count)))
+            start = max(start - count, 0)
+            stop -= count
+        return result
+
+
+class Snapshot:
+    """Маски рецептов одной загрузки индекса.
+
+    Номера битов выдаются по возрастанию id, так что старшие биты - новые
+    рецепты. Рецепт сохраняет номер до перезагрузки, новые получают
+    следующие номера, номера удаленных не используются до перезагрузки.
+    """
+    def __init__(self, version, synced_at):
+        self.version = version
+        self.synced_at = synced_at
+        self.loaded_at = time.monotonic()
+        self.recipes = {}
+        self.bits = {}
+        self.pks = []
+        self.ingredients = {}
+        self.sizes = {}
+
+    @classmethod
+    def load(cls):
+        """Все рецепты из базы, без блокировки индекса."""
+        version, _ = CatalogVersion.objects.current(
+            CatalogVersion.RECIPE_INGREDIENTS)
+        snapshot = cls(version, timezone.now())
+        recipes = defaultdict(set)
+        for recipe_id, ingredient_id in RecipeIngredient.objects.values_list(
+            'recipe_id', 'ingredient_id'
+        ).order_by().iterator(chunk_size=10000):
+            recipes[recipe_id].add(ingredient_id)
+        ingredients = defaultdict(list)
+        sizes = defaultdict(list)
+        for bit, recipe_id in enumerate(sorted(recipes)):
+            ingredient_ids = tuple(recipes[recipe_id])
+            snapshot.recipes[recipe_id] = ingredient_ids
+            snapshot.bits[recipe_id] = bit
+            snapshot.pks.append(recipe_id)
+            sizes[len(ingredient_ids)].append(bit)
+            for ingredient_id in ingredient_ids:
+                ingredients[ingredient_id].append(bit)
+        snapshot.ingredients = {
+            pk: to_bits(bits) for pk, bits in ingredients.items()}
+        snapshot.sizes = {size: to_bits(bits) for size, bits in sizes.items()}
+        return snapshot
+
+    def expired(self):
+        return time.monotonic() - self.loaded_at > PANTRY_RELOAD
+
+    def remove(self, recipe_id):
+        ingredient_ids = self.recipes.pop(recipe_id, None)
+        if ingredient_ids is None:
+            return
+        mask = ~(1 << self.bits[recipe_id])
+        for ingredient_id in ingredient_ids:
+            self.ingredients[ingredient_id] &= mask
+        self.sizes[len(ingredient_ids)] &= mask
+
+    def add(self, recipe_id, ingredient_ids):
+        if not ingredient_ids:
+            return
+        if recipe_id not in self.bits:
+            self.bits[recipe_id] = len(self.pks)
+            self.pks.append(recipe_id)
+        bit = 1 << self.bits[recipe_id]
+        self.recipes[recipe_id] = tuple(ingredient_ids)
+        for ingredient_id in ingredient_ids:
+            self.ingredients[ingredient_id] = self.ingredients.get(
+                ingredient_id, 0) | bit
+        size = len(ingredient_ids)
+        self.sizes[size] = self.sizes.get(size, 0) | bit
+
+
+def changes(since):
+    """Состав рецептов, измененных после since, и id удаленных."""
+    since -= timedelta(seconds=PANTRY_SYNC_MARGIN)
+    recipes = {
+        pk: set() for pk in Recipe.objects.filter(
+            updated_at__gte=since).values_list('id', flat=True)
+    }
+    for recipe_id, ingredient_id in RecipeIngredient.objects.filter(
+        recipe_id__in=list(recipes)
+    ).values_list('recipe_id', 'ingredient_id'):
+        recipes[recipe_id].add(ingredient_id)
+    deleted = set(RecipeTombstone.objects.filter(
+        deleted_at__gte=since).values_list('recipe_id', flat=True))
+    return recipes, deleted
+
+
+class PantryIndex:
+    """Маски рецептов по ингредиентам в памяти процесса.
+
+    Запросы к базе идут без блокировки, под ней только подмена снимка и
+    изменение масок.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._snapshot = None
+
+    def load(self, blocking):
+        """Полная перезагрузка одним потоком, остальные ждут только первой."""
+        if not self._load_lock.acquire(blocking=blocking):
+            return
+        try:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.expired():
+                snapshot = Snapshot.load()
+                with self._lock:
+                    self._snapshot = snapshot
+        finally:
+            self._load_lock.release()
+
+    def refresh(self, version):
+        """Перечитать рецепты, измененные после прошлой сверки."""
+        synced_at = timezone.now()
+        recipes, deleted = changes(self._snapshot.synced_at)
+        with self._lock:
+            snapshot = self._snapshot
+            # Снимок мог обновить другой поток, в том числе новее version
+            if snapshot.version >= version:
+                return
+            for recipe_id in deleted:
+                snapshot.remove(recipe_id)
+            for recipe_id in sorted(recipes):
+                snapshot.remove(recipe_id)
+                snapshot.add(recipe_id, recipes[recipe_id])
+            snapshot.version = version
+            snapshot.synced_at = synced_at
+
+    def sync(self):
+        """Догнать изменения, в том числе сделанные другими процессами."""
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.expired():
+            self.load(blocking=snapshot is None)
+            snapshot = self._snapshot
+        version, _ = CatalogVersion.objects.current(
+            CatalogVersion.RECIPE_INGREDIENTS)
+        if version > snapshot.version and (
+            timezone.now() - snapshot.synced_at
+            < timedelta(seconds=PANTRY_TOMBSTONE_KEEP - PANTRY_SYNC_MARGIN)
+        ):
+            self.refresh(version)
+
+    def discard(self, recipe_ids):
+        """Удаленные рецепты, другие процессы увидят их в RecipeTombstone."""
+        with self._lock:
+            if self._snapshot is not None:
+                for recipe_id in recipe_ids:
+                    self._snapshot.remove(recipe_id)
+
+    def search(self, ingredient_ids, max_missing):
+        """Рецепты, где недостает не больше max_missing ингредиентов.
+
+        Рецепты без единого из продуктов ingredient_ids не попадают.
+        """
+        self.sync()
+        ingredient_ids = set(ingredient_ids)
+        with self._lock:
+            snapshot = self._snapshot
+            planes = []
+            for ingredient_id in ingredient_ids:
+                if snapshot.ingredients.get(ingredient_id):
+                    add(planes, snapshot.ingredients[ingredient_id])
+            groups = []
+            for missing in range(max_missing + 1):
+                bits = 0
+                for size, recipes in snapshot.sizes.items():
+                    if missing < size <= len(ingredient_ids) + missing:
+                        bits |= recipes & equal(planes, size - missing)
+                groups.append((missing, bits))
+        return Matches(groups, snapshot.pks)
+
+    def missing(self, recipe_ids, ingredient_ids):
+        """Недостающие ингредиенты рецептов: {recipe_id: [ingredient_id]}."""
+        recipes = self._snapshot.recipes
+        return {
+            recipe_id: sorted(
+                set(recipes.get(recipe_id, ())) - set(ingredient_ids))
+            for recipe_id in recipe_ids
+        }
+
+
+pantry_index = PantryIndex()
+
+
+def recipes_changed(recipe_ids):
+    """Состав рецептов изменился в обход API: индексы перечитают их."""
+    Recipe.objects.filter(pk__in=recipe_ids).update(updated_at=timezone.now())
+    CatalogVersion.objects.bump(CatalogVersion.RECIPE_INGREDIENTS)
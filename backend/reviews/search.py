@@ -0,0 +1,82 @@
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+
+SEARCH_CONFIG = 'russian'
+# Postgres: вычисляемая колонка reviews_recipe.search_vector с GIN-индексом
+SEARCH_VECTOR = (
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(name, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(text, '')), 'B')"
+)
+# SQLite: отдельная таблица FTS5, обновляется из сигналов
+FTS_TABLE = 'reviews_recipe_fts'
+FTS_ROWS = (
+    "SELECT id, replace(replace(name, 'ё', 'е'), 'Ё', 'Е'), "
+    "replace(replace(text, 'ё', 'е'), 'Ё', 'Е') FROM reviews_recipe"
+)
+
+
+def fts_query(value):
+    """Запрос FTS5: все слова по началу, без последней буквы окончания."""
+    terms = []
+    for word in re.findall(r'\w+', value.lower().replace('ё', 'е')):
+        if len(word) > 4:
+            word = word[:-1]
+        terms.append(f'"{word}"*')
+    return ' '.join(terms)
+
+
+def index_recipes(pk=None):
+    """Обновить рецепт pk в FTS5, без pk - переиндексировать все."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        if pk is None:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, text) {FTS_ROWS}')
+            return
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, text) '
+            f'{FTS_ROWS} WHERE id = %s', [pk])
+
+
+def unindex_recipe(pk):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [pk])
+
+
+def search(queryset, value):
+    """Рецепты по названию и описанию, сначала самые подходящие."""
+    if not re.search(r'\w', value):
+        return queryset
+    if connection.vendor == 'postgresql':
+        query = f"websearch_to_tsquery('{SEARCH_CONFIG}', %s)"
+        return queryset.alias(
+            search_matched=RawSQL(
+                f'reviews_recipe.search_vector @@ {query}', [value],
+                output_field=BooleanField()),
+            search_rank=RawSQL(
+                f'ts_rank(reviews_recipe.search_vector, {query})', [value],
+                output_field=FloatField()),
+        ).filter(search_matched=True).order_by(
+            '-search_rank', '-created_at', '-id')
+    query = fts_query(value)
+    return queryset.alias(
+        search_matched=RawSQL(
+            f'reviews_recipe.id IN (SELECT rowid FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s)', [query],
+            output_field=BooleanField()),
+        search_rank=RawSQL(
+            f'(SELECT bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s '
+            f'AND {FTS_TABLE}.rowid = reviews_recipe.id)', [query],
+            output_field=FloatField()),
+    ).filter(search_matched=True).order_by(
+        'search_rank', '-created_at', '-id')
@@ -0,0 +1,120 @@
+"""Готовые списки покупок: сумма каждого ингредиента по корзине.
+
+Строки меняются на разницу количеств при добавлении рецепта в корзину,
+удалении из нее и изменении ингредиентов рецепта. Строки с нулем не
+удаляются, чтобы параллельные изменения не теряли прибавку.
+"""
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+
+from reviews.models import RecipeIngredient, ShoppingCart, ShoppingListItem
+
+
+logger = logging.getLogger(__name__)
+
+
+def recipe_amounts(recipe_id):
+    """Количества ингредиентов рецепта: {ingredient_id: amount}."""
+    return dict(RecipeIngredient.objects.filter(
+        recipe_id=recipe_id).values_list('ingredient_id', 'amount'))
+
+
+def change_amounts(user_ids, amounts):
+    """Прибавить amounts {ingredient_id: разница} к спискам user_ids.
+
+    Отрицательную сумму не пропускает ограничение amount >= 0: значит,
+    список разошелся с корзиной. Такие списки не меняются, а пересобираются
+    после коммита.
+    """
+    amounts = {pk: delta for pk, delta in amounts.items() if delta}
+    user_ids = list(user_ids)
+    if not amounts or not user_ids:
+        return
+    ShoppingListItem.objects.bulk_create(
+        [
+            ShoppingListItem(user_id=user_id, ingredient_id=pk)
+            for user_id in user_ids
+            for pk, delta in amounts.items() if delta > 0
+        ],
+        ignore_conflicts=True)
+    try:
+        with transaction.atomic():
+            ShoppingListItem.objects.filter(
+                user_id__in=user_ids, ingredient_id__in=amounts
+            ).update(amount=F('amount') + Case(
+                *(When(ingredient_id=pk, then=Value(delta))
+                  for pk, delta in amounts.items()),
+                default=Value(0), output_field=IntegerField()))
+    except IntegrityError:
+        logger.warning(
+            'Списки покупок %s разошлись с корзинами, пересборка', user_ids)
+        transaction.on_commit(lambda: rebuild(user_ids))
+
+
+def change_recipe(recipe_id, amounts):
+    """Ингредиенты рецепта изменились: поправить списки его корзин."""
+    change_amounts(
+        ShoppingCart.objects.filter(
+            recipe_id=recipe_id).values_list('user_id', flat=True),
+        amounts)
+
+
+def get_items(user):
+    """Список покупок одним чтением по индексу (user, ingredient)."""
+    return ShoppingListItem.objects.filter(
+        user=user, amount__gt=0
+    ).values(
+        'ingredient__name', 'ingredient__measurement_unit',
+        total_amount=F('amount')
+    ).order_by('ingredient__name', 'ingredient__measurement_unit')
+
+
+def rebuild(user_ids=None, batch_size=1000):
+    """Пересобрать списки из корзин, вернуть число исправленных строк."""
+    if user_ids is None:
+        user_ids = sorted(
+            set(ShoppingCart.objects.values_list('user_id', flat=True))
+            | set(ShoppingListItem.objects.values_list(
+                'user_id', flat=True)))
+    user_ids = list(user_ids)
+    repaired = 0
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        actual = {}
+        for user_id, ingredient_id, total in RecipeIngredient.objects.filter(
+            recipe__shoppingcarts__user_id__in=batch
+        ).values_list(
+            'recipe__shoppingcarts__user_id', 'ingredient_id'
+        ).annotate(total=Sum('amount')).order_by():
+            actual[user_id, ingredient_id] = total
+        stored = {
+            (item.user_id, item.ingredient_id): item
+            for item in ShoppingListItem.objects.filter(user_id__in=batch)
+        }
+        to_update = []
+        to_delete = []
+        for key, item in stored.items():
+            if key not in actual:
+                to_delete.append(item.pk)
+            elif item.amount != actual[key]:
+                item.amount = actual[key]
+                to_update.append(item)
+        to_create = [
+            ShoppingListItem(
+                user_id=user_id, ingredient_id=ingredient_id, amount=total)
+            for (user_id, ingredient_id), total in actual.items()
+            if (user_id, ingredient_id) not in stored
+        ]
+        ShoppingListItem.objects.bulk_update(to_update, ['amount'])
+        ShoppingListItem.objects.filter(pk__in=to_delete).delete()
+        ShoppingListItem.objects.bulk_create(to_create)
+        repaired += len(to_update) + len(to_delete) + len(to_create)
+    return repaired
+
+
+def rebuild_for_recipes(recipe_ids):
+    """Пересобрать списки тех, у кого рецепты recipe_ids в корзине."""
+    return rebuild(set(ShoppingCart.objects.filter(
+        recipe_id__in=recipe_ids).values_list('user_id', flat=True)))
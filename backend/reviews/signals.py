@@ -0,0 +1,210 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete)
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils import timezone
+
+from api.utils import forget_short_link
+from project.settings import PANTRY_TOMBSTONE_KEEP
+from reviews.autocomplete import prefix_index
+from reviews.counters import decrement, increment
+from reviews.models import (
+    CatalogVersion, Favorite, Ingredient, Recipe, RecipeTombstone,
+    ShoppingCart, Tag, tags_mask)
+from reviews import feed
+from reviews.pantry import pantry_index
+from reviews.search import index_recipes, unindex_recipe
+from reviews.shopping_lists import change_amounts, recipe_amounts
+from users.models import Follow
+
+
+User = get_user_model()
+COUNTERS = {
+    Favorite: 'favorites_count',
+    ShoppingCart: 'in_carts_count',
+}
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+def ingredient_changed(sender, **kwargs):
+    """Сброс индекса автодополнения при изменении ингредиентов."""
+    prefix_index.invalidate()
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+def ingredient_catalog_changed(sender, **kwargs):
+    CatalogVersion.objects.bump(CatalogVersion.INGREDIENTS)
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def tag_catalog_changed(sender, **kwargs):
+    CatalogVersion.objects.bump(CatalogVersion.TAGS)
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_renamed(sender, instance, created, **kwargs):
+    """Рецепты с ингредиентом выводят его название и единицу."""
+    if not created:
+        Recipe.objects.filter(
+            recipeingredients__ingredient=instance
+        ).update(updated_at=timezone.now())
+
+
+@receiver(pre_delete, sender=Ingredient)
+def ingredient_deleting(sender, instance, **kwargs):
+    """Ингредиент удаляется и из рецептов."""
+    Recipe.objects.filter(
+        recipeingredients__ingredient=instance
+    ).update(updated_at=timezone.now())
+    CatalogVersion.objects.bump(CatalogVersion.RECIPE_INGREDIENTS)
+
+
+@receiver(post_save, sender=Tag)
+def tag_renamed(sender, instance, created, **kwargs):
+    if not created:
+        Recipe.objects.with_any_tags(tags_mask([instance.bit])).update(
+            updated_at=timezone.now())
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields=None, **kwargs):
+    """Рецепты выводят автора; вход пользователя их не меняет."""
+    if created or update_fields and set(update_fields) <= {'last_login'}:
+        return
+    Recipe.objects.filter(author=instance).update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    """Короткая ссылка удаленного рецепта больше не открывается."""
+    forget_short_link(instance.short_link)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def recipe_marked(sender, instance, created, **kwargs):
+    """Счетчик избранного или списка покупок у рецепта."""
+    if created:
+        increment(
+            Recipe.objects.filter(pk=instance.recipe_id), COUNTERS[sender])
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def recipe_unmarked(sender, instance, **kwargs):
+    """Счетчик избранного или списка покупок при удалении."""
+    decrement(Recipe.objects.filter(pk=instance.recipe_id), COUNTERS[sender])
+
+
+@receiver(post_save, sender=ShoppingCart)
+def recipe_added_to_cart(sender, instance, created, **kwargs):
+    """Ингредиенты рецепта прибавляются к списку покупок."""
+    if created:
+        change_amounts(
+            [instance.user_id], recipe_amounts(instance.recipe_id))
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def recipe_removed_from_cart(sender, instance, **kwargs):
+    """До удаления: при удалении рецепта его ингредиенты еще на месте."""
+    change_amounts([instance.user_id], {
+        pk: -amount
+        for pk, amount in recipe_amounts(instance.recipe_id).items()
+    })
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, **kwargs):
+    """Поиск по рецептам в SQLite, в Postgres вектор считает база."""
+    index_recipes(instance.pk)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_search_deleted(sender, instance, **kwargs):
+    unindex_recipe(instance.pk)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_pantry_deleted(sender, instance, **kwargs):
+    """Удаленный рецепт уходит из подбора по продуктам во всех процессах."""
+    pk = instance.pk
+    RecipeTombstone.objects.filter(deleted_at__lt=timezone.now() - timedelta(
+        seconds=PANTRY_TOMBSTONE_KEEP)).delete()
+    RecipeTombstone.objects.create(recipe_id=pk)
+    CatalogVersion.objects.bump(CatalogVersion.RECIPE_INGREDIENTS)
+    transaction.on_commit(lambda: pantry_index.discard([pk]))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    """Счетчик рецептов автора."""
+    if created:
+        increment(User.objects.filter(pk=instance.author_id), 'recipes_count')
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_published(sender, instance, created, **kwargs):
+    """Новый рецепт - в ленты подписчиков автора, в фоне."""
+    if created:
+        feed.schedule(feed.fan_out, instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    """Счетчик подписчиков и рецепты автора в ленте читателя."""
+    if created:
+        increment(
+            User.objects.filter(pk=instance.following_id), 'followers_count')
+        feed.follows_changed(
+            instance.user_id, [instance.following_id], True)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    decrement(
+        User.objects.filter(pk=instance.following_id), 'followers_count')
+    feed.follows_changed(instance.user_id, [instance.following_id], False)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_author_count(sender, instance, **kwargs):
+    """Счетчик рецептов автора при удалении рецепта."""
+    decrement(User.objects.filter(pk=instance.author_id), 'recipes_count')
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Маска тегов рецепта вслед за recipe.tags."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        mask = tags_mask([instance.bit])
+        if action == 'post_clear':
+            recipes = Recipe.objects.with_any_tags(mask)
+        else:
+            recipes = Recipe.objects.filter(pk__in=pk_set)
+    else:
+        recipes = Recipe.objects.filter(pk=instance.pk)
+        mask = tags_mask(Tag.objects.filter(
+            pk__in=pk_set or ()).values_list('bit', flat=True))
+    now = timezone.now()
+    if action == 'post_add':
+        recipes.update(
+            tags_mask=F('tags_mask').bitor(mask), updated_at=now)
+    elif action == 'post_clear' and not reverse:
+        recipes.update(tags_mask=0, updated_at=now)
+    else:
+        recipes.update(
+            tags_mask=F('tags_mask').bitand(~mask), updated_at=now)
+
+
+@receiver(post_delete, sender=Tag)
+def tag_deleted(sender, instance, **kwargs):
+    """Бит удаленного тега больше не встречается в масках."""
+    mask = tags_mask([instance.bit])
+    Recipe.objects.with_any_tags(mask).update(
+        tags_mask=F('tags_mask').bitand(~mask), updated_at=timezone.now())
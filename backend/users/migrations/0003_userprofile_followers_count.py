@@ -0,0 +1,38 @@
+# Generated by Django 4.2.16 on 2026-10-18 23:10
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(model, related_field):
+    """Количество строк model, ссылающихся на внешний объект."""
+    return Coalesce(Subquery(
+        model.objects.filter(
+            **{related_field: OuterRef('pk')}
+        ).order_by().values(related_field).annotate(
+            total=Count('pk')).values('total')
+    ), 0)
+
+
+def fill_followers_count(apps, schema_editor):
+    UserProfile = apps.get_model('users', 'UserProfile')
+    Follow = apps.get_model('users', 'Follow')
+    UserProfile.objects.update(
+        followers_count=count_subquery(Follow, 'following'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_userprofile_recipes_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Подписчиков'),
+        ),
+        migrations.RunPython(fill_followers_count, migrations.RunPython.noop),
+    ]
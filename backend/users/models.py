@@ -22,6 +22,13 @@ class UserProfile(AbstractUser):
     )
     avatar = models.ImageField(
         upload_to='users/', null=True, blank=True, default=None)
+    avatar_derivatives = models.CharField(
+        max_length=100, blank=True, default='', editable=False,
+        verbose_name='Уменьшенные копии готовы для')
+    recipes_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Рецептов')
+    followers_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Подписчиков')
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
 
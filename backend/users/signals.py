@@ -0,0 +1,30 @@
+from django.contrib.auth import get_user_model, user_logged_out
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import forget_token, forget_user
+
+
+User = get_user_model()
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    """Удаленный токен больше не принимается."""
+    forget_token(instance.key, instance.user_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    """Новая версия пользователя в кэше."""
+    forget_user(instance.pk)
+
+
+@receiver(user_logged_out)
+def user_logged_out_handler(sender, request, user, **kwargs):
+    """Выход через djoser."""
+    token = getattr(request, 'auth', None)
+    if token is not None:
+        forget_token(token.key, token.user_id)